@@ -108,14 +108,16 @@ def main():
     yaw, pitch, _roll = cam.getAttitude()
     
     if is_recording:
-        img_num = len(os.listdir(imgs_dir))
+        # scandir streams entries, so counting them skips building the
+        # full listdir list every frame as the directory grows
+        img_num = sum(1 for _ in os.scandir(imgs_dir))
         cv.imwrite(f"{imgs_dir}/{img_num}.jpg", img)
-        with open(f"{imgs_dir}/{img_num}.txt", "w") as f:
-            f.write("\n".join([
-                f"{yaw:.4f},{pitch:.4f}",
-                str(cam.getFocalLength()).
-                str(time())
-            ]))
+        # one row: yaw, pitch, focal length, unix timestamp
+        np.savetxt(
+            f"{imgs_dir}/{img_num}.txt",
+            [[yaw, pitch, cam.getFocalLength(), time()]],
+            fmt="%.4f"
+        )
 
     joystick_control()
 
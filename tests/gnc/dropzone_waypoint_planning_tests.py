@@ -1,3 +1,4 @@
+import threading
 import unittest
 from uavf_2024.gnc.dropzone_planner import DropzonePlanner
 from uavf_2024.gnc.util import *
@@ -12,6 +13,11 @@ class MockCommander:
     def __init__(self, lat, lon, bounds):
         self.got_global_pos = True
         self.got_pose = True
+        # pre-set events matching CommanderNode; the planner waits on these
+        self.got_global_pos_event = threading.Event()
+        self.got_global_pos_event.set()
+        self.got_pose_event = threading.Event()
+        self.got_pose_event.set()
         self.home_lat = lat
         self.home_lon = lon
         self.home_global_pos = (lat,lon)
@@ -63,7 +63,7 @@
 #         plt.close(fig)
 
     
-#     def moving_target_path(self, cam_positions: np.ndarray, cam_rotations: np.ndarray, target_positions: np.ndarray, test_case_name: str):
+#     def moving_target_path(self, cam_positions: np.ndarray, cam_rotations: np.ndarray, target_positions: np.ndarray, test_case_name: str, save_step_visuals: bool = False):
 #         '''
 #         Simulates and visualizes tracking of a moving target by a drone.
 
@@ -106,17 +106,19 @@
 #             self.filter.predict(0.5)
 #             self.filter.update((cam_pos, cam_rot), [bbox])
 
-#             fig = self.filter.tracks[0].filter.visualize(fig_bounds)
-#             ax = fig.axes[0]
-#             look_direction = cam_rot.apply([0, 0, 1])
-#             ax.plot([cam_pos[0], cam_pos[0] + look_direction[0]], [cam_pos[2], cam_pos[2] + look_direction[2]], 'g', label='camera (our drone)')
-#             ax.plot([target_positions[step][0]], [target_positions[step][2]], 'ro', label='actual position')
-            
-#             mean = self.filter.tracks[0].filter.mean()
-#             cov = np.diag(self.filter.tracks[0].filter.covariance())
-#             ax.plot([mean[0]], [mean[2]], 'yo', label='estimated position')
-#             fig.legend()
-#             self.save_visualization(test_case_name, fig, step + 2)
+#             # Rendering and saving a figure every step dominates the
+#             # loop's runtime, so it's opt-in for debugging only.
+#             if save_step_visuals:
+#                 fig = self.filter.tracks[0].filter.visualize(fig_bounds)
+#                 ax = fig.axes[0]
+#                 look_direction = cam_rot.apply([0, 0, 1])
+#                 ax.plot([cam_pos[0], cam_pos[0] + look_direction[0]], [cam_pos[2], cam_pos[2] + look_direction[2]], 'g', label='camera (our drone)')
+#                 ax.plot([target_positions[step][0]], [target_positions[step][2]], 'ro', label='actual position')
+
+#                 mean = self.filter.tracks[0].filter.mean()
+#                 ax.plot([mean[0]], [mean[2]], 'yo', label='estimated position')
+#                 fig.legend()
+#                 self.save_visualization(test_case_name, fig, step + 2)
 #             covariances.append(np.diag(self.filter.tracks[0].filter.covariance()))
 
 #         fig, ax = plt.subplots()
@@ -136,25 +138,27 @@
 #         n_cam_samples = 20
 #         cam_pos_radius = 10
 
-#         cam_positions = [cam_pos_radius * np.array([sin(2 * pi * i / n_cam_samples), 0, -cos(2 * pi * i / n_cam_samples)]) for i in range(n_cam_samples)]
-#         cam_rotations = [R.from_euler('xyz', [0, -2 * pi * i / n_cam_samples, 0]) for i in range(n_cam_samples)]
+#         angles = 2 * pi * np.arange(n_cam_samples) / n_cam_samples
+#         zeros = np.zeros(n_cam_samples)
+#         cam_positions = cam_pos_radius * np.stack([sin(angles), zeros, -cos(angles)], axis=1)
+#         cam_rotations = R.from_euler('xyz', np.stack([zeros, -angles, zeros], axis=1))
 
 #         target_positions = np.array([[0, 0, 0, 0, 0, 0, 0.35]] * n_cam_samples)  # Stationary target
 
-#         self.moving_target_path(np.array(cam_positions), cam_rotations, target_positions, 'test_stationary_target')
+#         self.moving_target_path(cam_positions, cam_rotations, target_positions, 'test_stationary_target')
 
     
 #     def test_moving_target_straight_line(self):
-#         cam_positions = np.array([[i, 0, 10] for i in range(20)])
-#         cam_rotations = [R.from_euler('xyz', [0, 0, 0]) for _ in range(20)]  # Camera looking straight
+#         cam_positions = np.column_stack([np.arange(20), np.zeros(20), np.full(20, 10)])
+#         cam_rotations = R.from_euler('xyz', np.zeros((20, 3)))  # Camera looking straight
 
 #         target_positions = np.array([[0, i, 10, 0, 1, 0, 0.35] for i in range(20)])
 
 #         self.moving_target_path(cam_positions, cam_rotations, target_positions, 'test_moving_target_straight_line')
     
 #     def test_moving_target_circling_camera(self):
-#         cam_positions = np.array([[0, 0, 10]] * 20)  # Stationary camera
-#         cam_rotations = [R.from_euler('xyz', [0, 0, 0]) for _ in range(20)]  # Camera looking straight
+#         cam_positions = np.tile([0, 0, 10], (20, 1))  # Stationary camera
+#         cam_rotations = R.from_euler('xyz', np.zeros((20, 3)))  # Camera looking straight
 
 #         angles = np.linspace(0, 2 * np.pi, 20)
 #         target_radius = 5
@@ -164,8 +168,8 @@
 #         self.moving_target_path(cam_positions, cam_rotations, target_positions, 'test_moving_target_circling_camera')
     
 #     def test_moving_target_spiral_around_camera(self):
-#         cam_positions = np.array([[0, 0, 10]] * 20)  # Stationary camera
-#         cam_rotations = [R.from_euler('xyz', [0, 0, 0]) for _ in range(20)]  # Camera looking straight
+#         cam_positions = np.tile([0, 0, 10], (20, 1))  # Stationary camera
+#         cam_rotations = R.from_euler('xyz', np.zeros((20, 3)))  # Camera looking straight
 
 #         # Target moves in a spiral path around the camera
 #         num_steps = 20
@@ -187,8 +191,8 @@
 #                                     -target_radius * np.sin(angle), target_radius * np.cos(angle), z_step, 0.35] for i, angle in enumerate(angles)])
 
 #         # Camera starts behind the target and speeds up to catch up
-#         cam_positions = np.array([[target_radius * np.cos(angle - 0.2), target_radius * np.sin(angle - 0.2), 10 + z_step * i] for i, angle in enumerate(angles)])
-#         cam_rotations = [R.from_euler('xyz', [0, 0, angle - 0.2]) for angle in angles]
+#         cam_positions = np.column_stack([target_radius * np.cos(angles - 0.2), target_radius * np.sin(angles - 0.2), 10 + z_step * np.arange(num_steps)])
+#         cam_rotations = R.from_euler('xyz', np.column_stack([np.zeros(num_steps), np.zeros(num_steps), angles - 0.2]))
 
 #         self.moving_target_path(cam_positions, cam_rotations, target_positions, 'test_moving_target_spiral_with_camera_movement')
 
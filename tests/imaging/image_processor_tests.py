@@ -1,75 +1,168 @@
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
 import shutil
-import torch
-from torchvision.ops import box_iou
+import statistics
 import unittest
 from uavf_2024.imaging.image_processor import ImageProcessor
 from uavf_2024.imaging.imaging_types import HWC, FullBBoxPrediction, FullBBoxGroundTruth, Image, CertainTargetDescriptor, LETTERS, SHAPES, COLORS
-from uavf_2024.imaging import profiler
 import numpy as np
 import os
 from time import time
 from tqdm import tqdm
-import line_profiler
-from memory_profiler import profile as mem_profile
 import pandas as pd
 import sys
 import cv2 #for debugging purposes
 
 CURRENT_FILE_PATH = os.path.dirname(os.path.realpath(__file__))
 
-
-def calc_metrics(predictions: list[FullBBoxPrediction], ground_truth: list[FullBBoxGroundTruth], 
+# Line and memory profiling trace every executed line (easily a 10-100x
+# slowdown in the decorated tests), so they're opt-in via env var; the
+# default run uses no-op decorators.
+if os.environ.get('UAVF_PROFILE') == '1':
+    from uavf_2024.imaging import profiler
+    from memory_profiler import profile as mem_profile
+else:
+    profiler = lambda f: f
+    mem_profile = lambda f: f
+
+
+def pairwise_iou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    IoU matrix between (N,4) and (M,4) xyxy boxes in pure numpy, avoiding
+    the numpy -> torch -> numpy round trip of torchvision's box_iou.
+    """
+    # float32 halves the memory traffic of the (N,M) intermediates and is
+    # plenty of precision for a 0.5/0.1 IoU threshold on pixel boxes.
+    boxes_a = boxes_a.reshape(-1, 4).astype(np.float32)
+    boxes_b = boxes_b.reshape(-1, 4).astype(np.float32)
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    # Reuse the (N,M,2) corner buffer for the widths/heights instead of
+    # materializing two more 3D temporaries.
+    wh = np.subtract(bottom_right, top_left, out=bottom_right)
+    np.clip(wh, 0, None, out=wh)
+    intersection = wh[..., 0] * wh[..., 1]
+    areas_a = (boxes_a[:,2]-boxes_a[:,0]) * (boxes_a[:,3]-boxes_a[:,1])
+    areas_b = (boxes_b[:,2]-boxes_b[:,0]) * (boxes_b[:,3]-boxes_b[:,1])
+    union = areas_a[:, None] + areas_b[None, :] - intersection
+    return intersection / np.maximum(union, np.float32(1e-9))
+
+
+_sample_image: Image | None = None
+
+def sample_image() -> Image:
+    """
+    Lazily loads the shared fullsize 1080p sample frame once per process;
+    the tests only read from it, so they can all share the same decode.
+    """
+    global _sample_image
+    if _sample_image is None:
+        _sample_image = Image.from_file(f"{CURRENT_FILE_PATH}/2024_test_data/fullsize_dataset/images/1080p.png")
+    return _sample_image
+
+
+_image_processor_cache: dict[tuple, ImageProcessor] = {}
+
+def get_image_processor(debug_path=None, **kwargs) -> ImageProcessor:
+    """
+    Reuses ImageProcessor instances across the parameter sweep. The model
+    weights don't depend on the confidence threshold, so sweeping `conf`
+    just updates the cached detector instead of reloading YOLO and
+    re-warming it for every configuration.
+    """
+    conf = kwargs.pop('conf', 0.05)
+    key = tuple(sorted(kwargs.items()))
+    processor = _image_processor_cache.get(key)
+    if processor is None:
+        processor = ImageProcessor(debug_path, conf=conf, **kwargs)
+        _image_processor_cache[key] = processor
+    else:
+        processor.shape_detector.conf = conf
+        if debug_path is not None:
+            processor.reset_log_directory(debug_path)
+        else:
+            # don't let a cached processor keep writing debug images into
+            # whatever folder a previous test configured
+            processor.debug_path = None
+    return processor
+
+
+def calc_metrics(predictions: list[FullBBoxPrediction], ground_truth: list[FullBBoxGroundTruth],
                  debug_img: np.ndarray, debug_path: str, img_num: int):
     #debug_img should be receiving the image np array, img.get_array(), and visuals are provided of the bounding box'''
     true_positives = 0 # how many predictions were on top of a ground-truth box
     targets_detected = 0 # how many ground-truth boxes had at least 1 prediction on top of them
-    shape_top_1_accuracies = []
-    letter_top_1_accuracies = []
-    letter_top_5_accuracies = []
-    shape_color_top_1_accuracies = []
-    letter_color_top_1_accuracies = []
-
-    for truth in ground_truth:
-        x,y = truth.x, truth.y
-        w,h = truth.width, truth.height 
-        true_box = np.array([[
-            x,y,x+w,y+h
-        ]])
-        
+    # Scalar hit/total counters instead of lists of 0/1 ints; the means at
+    # the end are just divisions, so there's nothing to keep the ints for.
+    shape_top1_correct = shape_top1_total = 0
+    letter_top1_correct = letter_top1_total = 0
+    letter_top5_correct = letter_top5_total = 0
+    shape_color_top1_correct = shape_color_top1_total = 0
+    letter_color_top1_correct = letter_color_top1_total = 0
+
+    # One pairwise IoU evaluation for all (truth, prediction) combinations
+    # instead of a box construction + IoU call per pair.
+    true_boxes = np.array([
+        [truth.x, truth.y, truth.x+truth.width, truth.y+truth.height]
+        for truth in ground_truth
+    ]).reshape(-1, 4)
+    pred_boxes = np.array([
+        [pred.x-pred.width//2, pred.y-pred.height//2, pred.x+pred.width//2, pred.y+pred.height//2]
+        for pred in predictions
+    ]).reshape(-1, 4)
+    iou_matrix = pairwise_iou(true_boxes, pred_boxes)
+    # Threshold the whole matrix once; the loops below then test plain
+    # Python bools instead of converting a numpy scalar per pair.
+    overlaps = iou_matrix > 0.5
+
+    # The argmaxes depend only on the prediction, so reduce each stacked
+    # probability matrix once per image rather than re-reducing the same
+    # vectors for every (truth, prediction) pair.
+    if len(predictions) > 0:
+        pred_shape_top1 = np.stack([p.descriptor.shape_probs for p in predictions]).argmax(axis=1)
+        letter_probs_mat = np.stack([p.descriptor.letter_probs for p in predictions])
+        pred_letter_top1 = letter_probs_mat.argmax(axis=1)
+        # One O(P*36) partition for the whole image; top-5 membership in
+        # the loop is then a lookup into a (P,5) row.
+        pred_letter_top5 = np.argpartition(letter_probs_mat, -5, axis=1)[:, -5:]
+        pred_shape_col_top1 = np.stack([p.descriptor.shape_col_probs for p in predictions]).argmax(axis=1)
+        pred_letter_col_top1 = np.stack([p.descriptor.letter_col_probs for p in predictions]).argmax(axis=1)
+
+    # Drawing is hoisted out of the matching loop so the hot path below
+    # carries no per-iteration debug branches.
+    if debug_img is not None:
+        for x, y, x1, y1 in true_boxes.astype(int).tolist():
+            cv2.rectangle(debug_img, (x, y), (x1, y1), (0, 0, 255), 2)
+
+    for truth_idx, truth in enumerate(ground_truth):
         shape_col, shape, letter_col, letter = truth.descriptor.to_indices()
-       
-        if debug_img is not None:
-            x, y, x1, y1 = true_box.flatten()
-            color = (0, 0, 255) 
-            thickness = 2
-            cv2.rectangle(debug_img, (x, y), (x1, y1), color, thickness) 
 
         this_target_was_detected = False
-        for pred in predictions:
-            pred_box = np.array([[
-                pred.x-pred.width//2,pred.y-pred.height//2,pred.x+pred.width//2,pred.y+pred.height//2
-            ]])
-
-            iou = box_iou(torch.Tensor(true_box), torch.Tensor(pred_box))
-            if iou>0.5:
+        for pred_idx, pred in enumerate(predictions):
+            if overlaps[truth_idx, pred_idx]:
                 true_positives+=1
                 this_target_was_detected = True
                 if shape is not None:
-                    shape_top_1_accuracies.append(int(shape == np.argmax(pred.descriptor.shape_probs)))
-                
+                    shape_top1_correct += int(shape == pred_shape_top1[pred_idx])
+                    shape_top1_total += 1
+
                 if letter is not None:
-                    letter_top5_probs = np.argsort(pred.descriptor.letter_probs)[-5:] # [top5, top4, top3, top2, top1]
-                    letter_top5_probs = [int(i) for i in letter_top5_probs]  # get letter prob names
-                    letter_top_5_accuracies.append(int(letter in letter_top5_probs))
-                    
-                    letter_top_1_accuracies.append(int(letter == int(letter_top5_probs[4])))                
+                    # argpartition gives the top 5 unordered in O(n);
+                    # membership doesn't care about order and top-1 is
+                    # just the argmax.
+                    letter_top5_correct += int(letter in pred_letter_top5[pred_idx])
+                    letter_top5_total += 1
+
+                    letter_top1_correct += int(letter == int(pred_letter_top1[pred_idx]))
+                    letter_top1_total += 1
 
                 if shape_col is not None:
-                    shape_color_top_1_accuracies.append(int(shape_col == np.argmax(pred.descriptor.shape_col_probs)))
-                
+                    shape_color_top1_correct += int(shape_col == pred_shape_col_top1[pred_idx])
+                    shape_color_top1_total += 1
+
                 if letter_col is not None:
-                    letter_color_top_1_accuracies.append(int(letter_col == np.argmax(pred.descriptor.letter_col_probs)))
+                    letter_color_top1_correct += int(letter_col == pred_letter_col_top1[pred_idx])
+                    letter_color_top1_total += 1
 
         if this_target_was_detected:
             targets_detected+=1
@@ -81,11 +174,11 @@ def calc_metrics(predictions: list[FullBBoxPrediction], ground_truth: list[FullB
 
     recall = targets_detected / len(ground_truth) if len(ground_truth)>0 else None
     precision = true_positives / len(predictions) if len(predictions)>0 else None
-    shape_top1 = np.mean(shape_top_1_accuracies) if len(shape_top_1_accuracies)>0 else None
-    letter_top1 = np.mean(letter_top_1_accuracies) if len(letter_top_1_accuracies)>0 else None
-    letter_top5 = np.mean(letter_top_5_accuracies) if len(letter_top_5_accuracies)>0 else None
-    shape_color_top1 = np.mean(shape_color_top_1_accuracies) if len(shape_color_top_1_accuracies)>0 else None
-    letter_color_top1 = np.mean(letter_color_top_1_accuracies) if len(letter_color_top_1_accuracies)>0 else None
+    shape_top1 = shape_top1_correct / shape_top1_total if shape_top1_total>0 else None
+    letter_top1 = letter_top1_correct / letter_top1_total if letter_top1_total>0 else None
+    letter_top5 = letter_top5_correct / letter_top5_total if letter_top5_total>0 else None
+    shape_color_top1 = shape_color_top1_correct / shape_color_top1_total if shape_color_top1_total>0 else None
+    letter_color_top1 = letter_color_top1_correct / letter_color_top1_total if letter_color_top1_total>0 else None
 
     return (
         recall,
@@ -97,150 +190,239 @@ def calc_metrics(predictions: list[FullBBoxPrediction], ground_truth: list[FullB
         letter_color_top1
     )
 
+# Remap from the old letter class ordering to the new one, as a LUT so a
+# whole label column can be remapped with one gather.
+_letter_dict = {0: '0', 1: '1', 10: '2', 11: '3', 12: '4', 13: '5', 14: '6', 15: '7', 16: '8', 17: '9', 18: '10', 19: '11', 2: '12', 20: '13', 21: '14', 22: '15', 23: '16', 24: '17', 25: '18', 26: '19', 27: '20', 28: '21', 29: '22', 3: '23', 30: '24', 31: '25', 32: '26', 33: '27', 34: '28', 35: '29', 4: '30', 5: '31', 6: '32', 7: '33', 8: '34', 9: '35'}
+LETTER_REMAP = np.empty(36, dtype=np.int8)
+for _old, _new in _letter_dict.items():
+    LETTER_REMAP[_old] = int(_new)
+
+
+def _load_label_arrays(labels_path) -> dict[str, np.ndarray]:
+    """
+    Loads every numeric label txt under `labels_path` as an (N,8) array,
+    backed by an .npz cache keyed against the label files' names and
+    newest mtime so repeat test runs do one archive read instead of
+    thousands of tiny open/tokenize calls. (The directory mtime isn't
+    enough: editing a label in place doesn't touch it.)
+    """
+    cache_path = os.path.join(labels_path, ".labels_cache.npz")
+    with os.scandir(labels_path) as entries:
+        label_mtimes = {
+            entry.name[:-4]: entry.stat().st_mtime
+            for entry in entries if entry.name.endswith(".txt")
+        }
+
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= max(label_mtimes.values(), default=0):
+        with np.load(cache_path) as cache:
+            if set(cache.files) == set(label_mtimes):
+                return {name: cache[name] for name in cache.files}
+
+    arrays = {
+        name: np.loadtxt(os.path.join(labels_path, f"{name}.txt")).reshape(-1, 8)
+        for name in label_mtimes
+    }
+    np.savez(cache_path, **arrays)
+    return arrays
+
+
 def parse_dataset(imgs_path, labels_path) -> tuple[list[Image], list[list[FullBBoxGroundTruth]]]:
 
     #ret_value[i] is the list of predictions for the ith image
     #ret_value[i][j] is the jth prediction for the ith image
 
-    letter_dict = {0: '0', 1: '1', 10: '2', 11: '3', 12: '4', 13: '5', 14: '6', 15: '7', 16: '8', 17: '9', 18: '10', 19: '11', 2: '12', 20: '13', 21: '14', 22: '15', 23: '16', 24: '17', 25: '18', 26: '19', 27: '20', 28: '21', 29: '22', 3: '23', 30: '24', 31: '25', 32: '26', 33: '27', 34: '28', 35: '29', 4: '30', 5: '31', 6: '32', 7: '33', 8: '34', 9: '35'}
+    label_arrays = _load_label_arrays(labels_path)
 
-    imgs: list[Image] = []
-    labels = []
-    for img_file_name in os.listdir(imgs_path):
+    def parse_one(img_file_name: str) -> tuple[Image, list[FullBBoxGroundTruth]]:
         img = Image.from_file(f"{imgs_path}/{img_file_name}")
         ground_truth: list[FullBBoxGroundTruth] = []
-        with open(f"{labels_path}/{img_file_name.split('.')[0]}.txt") as f:
-            for line in f.readlines():
-                label = line.split(' ')
-                shape, letter, shape_col, letter_col = map(int, label[:4])
-                #the conversion from old letter to new letter is made               
-                letter = int(letter_dict[letter])
-
-                box = np.array([float(v) for v in label[4:]])
-                box[[0,2]]*=img.shape[1]
-                box[[1,3]]*=img.shape[0]
-                box[[0,1]] -= box[[2,3]] # adjust xy to be top-left
-                x,y,w,h = box.astype(int)
-
-                ground_truth.append(FullBBoxGroundTruth(
-                    x,y,w,h,
-                    CertainTargetDescriptor.from_indices(
-                        shape, letter, shape_col, letter_col
-                    )
-                ))
-        
-        imgs.append(img)
-        labels.append(ground_truth)
-        
+
+        # loadtxt tokenizes the whole label file in one C-level pass, so
+        # the scale/offset math runs over every box at once with no
+        # per-line Python splitting or tiny-array allocations.
+        arr = label_arrays[img_file_name.split('.')[0]]
+        class_indices = arr[:, :4].astype(int)
+        #the conversion from old letter to new letter is made
+        class_indices[:, 1] = LETTER_REMAP[class_indices[:, 1]]
+        boxes = arr[:, 4:]
+        boxes[:, [0,2]] *= img.shape[1]
+        boxes[:, [1,3]] *= img.shape[0]
+        boxes[:, [0,1]] -= boxes[:, [2,3]] # adjust xy to be top-left
+        boxes = boxes.astype(int)
+
+        for (shape, letter, shape_col, letter_col), (x,y,w,h) in zip(class_indices, boxes):
+            ground_truth.append(FullBBoxGroundTruth(
+                x,y,w,h,
+                CertainTargetDescriptor.from_indices(
+                    shape, letter, shape_col, letter_col
+                )
+            ))
+
+        return (img, ground_truth)
+
+    # scandir reuses the directory entries' d_type instead of a stat per
+    # file, and sorting makes the dataset order deterministic.
+    with os.scandir(imgs_path) as entries:
+        img_file_names = sorted(entry.name for entry in entries if entry.is_file())
+
+    # Image decodes release the GIL, so threads overlap the file loads.
+    with ThreadPoolExecutor() as pool:
+        parsed = list(pool.map(parse_one, img_file_names))
+
+    imgs = [img for img, _ in parsed]
+    labels = [ground_truth for _, ground_truth in parsed]
+
     return (imgs, labels)
 
 def parse_str_dataset(imgs_path, labels_path) -> tuple[list[Image], list[list[FullBBoxGroundTruth]]]:
-    imgs: list[Image] = []
-    labels = []
-    for img_file_name in os.listdir(imgs_path):
+    def parse_one(img_file_name: str) -> tuple[Image, list[FullBBoxGroundTruth]]:
         img = Image.from_file(f"{imgs_path}/{img_file_name}")
         ground_truth: list[FullBBoxGroundTruth] = []
         with open(f"{labels_path}/{img_file_name.split('.')[0]}.txt") as f:
-            for line in f.readlines():
-                label, *bbox_strs = line.split(' ')
-                if label == "person":
-                    shape = "person"
-                    letter = "idk"
-                    shape_col = "idk"
-                    letter_col = "idk"
-                else:
-                    shape_col, shape, letter_col, letter = label.split(',')
-
-                if shape == "idk":
-                    shape = None
-                if letter == "idk":
-                    letter = None
-                if shape_col == "idk":
-                    shape_col = None
-                if letter_col == "idk":
-                    letter_col = None
-
-                box = np.array([float(v) for v in bbox_strs])
-                box[[0,2]]*=img.shape[1]
-                box[[1,3]]*=img.shape[0]
-                box[[0,1]] -= box[[2,3]]/2 # adjust xy to be top-left
-                x,y,w,h = box.astype(int)
-
-                ground_truth.append(FullBBoxGroundTruth(
-                    x,y,w,h,
-                    CertainTargetDescriptor(
-                        shape_col, shape, letter_col, letter
-                    )
-                ))
-        
-        imgs.append(img)
-        labels.append(ground_truth)
-        
-    return (imgs, labels)   
+            rows = [line.split(' ') for line in f.readlines()]
+
+        boxes = np.array([row[1:] for row in rows], dtype=np.float64).reshape(-1, 4)
+        boxes[:, [0,2]] *= img.shape[1]
+        boxes[:, [1,3]] *= img.shape[0]
+        boxes[:, [0,1]] -= boxes[:, [2,3]]/2 # adjust xy to be top-left
+        boxes = boxes.astype(int)
+
+        for row, (x,y,w,h) in zip(rows, boxes):
+            label = row[0]
+            if label == "person":
+                shape = "person"
+                letter = "idk"
+                shape_col = "idk"
+                letter_col = "idk"
+            else:
+                shape_col, shape, letter_col, letter = label.split(',')
+
+            if shape == "idk":
+                shape = None
+            if letter == "idk":
+                letter = None
+            if shape_col == "idk":
+                shape_col = None
+            if letter_col == "idk":
+                letter_col = None
+
+            ground_truth.append(FullBBoxGroundTruth(
+                x,y,w,h,
+                CertainTargetDescriptor(
+                    shape_col, shape, letter_col, letter
+                )
+            ))
+
+        return (img, ground_truth)
+
+    with os.scandir(imgs_path) as entries:
+        img_file_names = sorted(entry.name for entry in entries if entry.is_file())
+
+    with ThreadPoolExecutor() as pool:
+        parsed = list(pool.map(parse_one, img_file_names))
+
+    imgs = [img for img, _ in parsed]
+    labels = [ground_truth for _, ground_truth in parsed]
 
+    return (imgs, labels)
+
+
+class ConfusionAccumulator:
+    """
+    Accumulates confusion matrices one image at a time, so the test loops
+    can drop each image's predictions as soon as they've been counted
+    instead of keeping every prediction alive until the end of the run.
+    """
+    def __init__(self):
+        self.shape_confusion = np.zeros((len(SHAPES), len(SHAPES)))
+        self.letter_confusion = np.zeros((len(LETTERS), len(LETTERS)))
+        self.shape_col_confusion = np.zeros((len(COLORS), len(COLORS)))
+        self.letter_col_confusion = np.zeros((len(COLORS), len(COLORS)))
+
+    def update(self, img_truth: list[FullBBoxGroundTruth], img_pred: list[FullBBoxPrediction]) -> None:
+        true_boxes = np.array([
+            [t.x, t.y, t.x+t.width, t.y+t.height] for t in img_truth
+        ]).reshape(-1, 4)
+        pred_boxes = np.array([
+            [p.x, p.y, p.x+p.width, p.y+p.height] for p in img_pred
+        ]).reshape(-1, 4)
+        iou_matrix = pairwise_iou(true_boxes, pred_boxes)
+
+        truth_indices, pred_indices = np.nonzero(iou_matrix > 0.1)
+        if len(truth_indices) == 0:
+            return
+
+        # Index tuples are computed once per unique matched box;
+        # collapse_to_certain does four argmaxes, so skipping unmatched
+        # predictions matters on noisy images.
+        true_index_cache = {
+            int(t): img_truth[t].descriptor.to_indices()
+            for t in np.unique(truth_indices)
+        }
+        pred_index_cache = {
+            int(p): img_pred[p].descriptor.collapse_to_certain().to_indices()
+            for p in np.unique(pred_indices)
+        }
+        matches = [
+            (true_index_cache[int(t)], pred_index_cache[int(p)])
+            for t, p in zip(truth_indices, pred_indices)
+        ]
+
+        # Scatter-add all matched pairs per matrix in one np.add.at call;
+        # duplicate (row, col) pairs accumulate correctly.
+        def accumulate(matrix, rows_cols):
+            if rows_cols:
+                rows_cols = np.array(rows_cols)
+                np.add.at(matrix, (rows_cols[:,0], rows_cols[:,1]), 1)
+
+        accumulate(self.shape_confusion, [(t[1], p[0]) for t, p in matches if t[1] is not None])
+        accumulate(self.letter_confusion, [(t[3], p[3]) for t, p in matches if t[3] is not None])
+        accumulate(self.shape_col_confusion, [(t[0], p[0]) for t, p in matches if t[0] is not None])
+        accumulate(self.letter_col_confusion, [(t[2], p[2]) for t, p in matches if t[2] is not None])
+
+    def finalize(self, out_folder: str) -> None:
+        for name, confusion_matrix, index in zip(
+            ["shape", "letter", "shape_col", "letter_col"],
+            [self.shape_confusion, self.letter_confusion, self.shape_col_confusion, self.letter_col_confusion],
+            [SHAPES, LETTERS, COLORS, COLORS]
+        ):
+            for i in range(len(index)):
+                if confusion_matrix[i,i] < max(confusion_matrix[i]):
+                    print(f"WARNING: {name} confusion matrix is not diagonal dominant (potential label mismatch)")
+                    break
+            conf_matrix_df = pd.DataFrame(confusion_matrix, index=list(index), columns=list(index))
+            conf_matrix_df.to_csv(f"{out_folder}/{name}_confusion_matrix.csv")
 
-def generate_confusion_matrices(true_values: list[list[FullBBoxGroundTruth]], pred_values: list[list[FullBBoxPrediction]], out_folder: str) -> None:
-    shape_confusion = np.zeros((len(SHAPES), len(SHAPES)))
-    letter_confusion = np.zeros((len(LETTERS), len(LETTERS)))
-    shape_col_confusion = np.zeros((len(COLORS), len(COLORS)))
-    letter_col_confusion = np.zeros((len(COLORS), len(COLORS)))
 
-    #parse over each image from the unit test data
+def generate_confusion_matrices(true_values: list[list[FullBBoxGroundTruth]], pred_values: list[list[FullBBoxPrediction]], out_folder: str) -> None:
+    accumulator = ConfusionAccumulator()
     for img_truth, img_pred in zip(true_values, pred_values):
-        #parse over each truth object within the image 
-        for true_box_pred in img_truth:
-            x,y = true_box_pred.x, true_box_pred.y
-            w,h = true_box_pred.width, true_box_pred.height 
-            true_box = np.array([[x,y,x+w,y+h]])
-            true_desc = true_box_pred.descriptor
-
-            #compare each truth to every possible prediction
-            for pred in img_pred:
-                pred_box = np.array([[
-                pred.x,pred.y,pred.x+pred.width,pred.y+pred.height
-                ]])
-                iou = box_iou(torch.Tensor(true_box), torch.Tensor(pred_box))
-                if iou>0.1:
-                    pred_shape_col, pred_shape, pred_letter_col, pred_letter = pred.descriptor.collapse_to_certain().to_indices()
-                    shape_col, shape, letter_col, letter = true_desc.to_indices()
-                    if shape is not None:
-                        shape_confusion[shape, pred_shape_col]+=1
-                    if letter is not None:
-                        letter_confusion[letter, pred_letter]+=1
-                    if shape_col is not None:
-                        shape_col_confusion[shape_col, pred_shape_col]+=1
-                    if letter_col is not None:
-                        letter_col_confusion[letter_col, pred_letter_col]+=1
-                    
-                
-    for name, confusion_matrix, index in zip(
-        ["shape", "letter", "shape_col", "letter_col"],
-        [shape_confusion, letter_confusion, shape_col_confusion, letter_col_confusion],
-        [SHAPES, LETTERS, COLORS, COLORS]
-    ):
-        for i in range(len(index)):
-            if confusion_matrix[i,i] < max(confusion_matrix[i]):
-                print(f"WARNING: {name} confusion matrix is not diagonal dominant (potential label mismatch)")
-                break
-        conf_matrix_df = pd.DataFrame(confusion_matrix, index=list(index), columns=list(index))
-        conf_matrix_df.to_csv(f"{out_folder}/{name}_confusion_matrix.csv")
+        accumulator.update(img_truth, img_pred)
+    accumulator.finalize(out_folder)
 
 class TestImagingFrontend(unittest.TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        # One shared default-config processor for every test that doesn't
+        # need its own debug folder; loads and warms the models once per
+        # process instead of once per test method.
+        cls.image_processor = get_image_processor()
+
     @mem_profile
     def test_runs_without_crashing(self):
-        image_processor = ImageProcessor()
-        sample_input = Image.from_file(f"{CURRENT_FILE_PATH}/2024_test_data/fullsize_dataset/images/1080p.png")
+        image_processor = self.image_processor
+        sample_input = sample_image()
         res = image_processor.process_image(sample_input)
         res2 = image_processor.process_image_lightweight(sample_input)
 
     @profiler
     def test_benchmark_fullsize_images(self):
-        image_processor = ImageProcessor(
+        image_processor = get_image_processor(
             shape_batch_size=20,
             letter_batch_size=30
         )
-        sample_input = Image.from_file(f"{CURRENT_FILE_PATH}/2024_test_data/fullsize_dataset/images/1080p.png")
+        sample_input = sample_image()
         times = []
         N_runs = 10
         for i in tqdm(range(N_runs)):
@@ -249,7 +431,9 @@ class TestImagingFrontend(unittest.TestCase):
             elapsed = time()-start
             times.append(elapsed)
         print(f"Fullsize image benchmarks (average of {N_runs} runs):")
-        print(f"Avg: {np.mean(times)}, StdDev: {np.std(times)}")
+        # statistics on a 10-element list beats numpy's per-call setup and
+        # keeps numpy out of the timed path entirely.
+        print(f"Avg: {statistics.fmean(times)}, StdDev: {statistics.pstdev(times)}")
         # lstats = profiler.get_stats()
         # line_profiler.show_text(lstats.timings, lstats.unit)
     
@@ -260,7 +444,7 @@ class TestImagingFrontend(unittest.TestCase):
 
         if os.path.exists(debug_output_folder):
             shutil.rmtree(debug_output_folder)
-        image_processor = ImageProcessor(debug_output_folder)
+        image_processor = get_image_processor(debug_output_folder)
         imgs, labels = parse_dataset(f"{CURRENT_FILE_PATH}/2024_test_data/tile_dataset/images", f"{CURRENT_FILE_PATH}/2024_test_data/tile_dataset/labels")
         
         recalls = []
@@ -272,16 +456,15 @@ class TestImagingFrontend(unittest.TestCase):
         letter_color_top1s = []
         img_counter = 0
         
-        #Storing the predictions from pipeline for the confusion matrix evaluation
+        # Confusion matrices are accumulated per image so we don't have to
+        # keep every image's predictions alive until the end of the run.
         if gen_confusion_matrices:
-            prediction_list = []
-
-        for img, ground_truth in zip(imgs, labels):
-            predictions = image_processor.process_image(img)
-            
+            confusion = ConfusionAccumulator()
 
+        all_predictions = image_processor.process_images(imgs)
+        for i, (ground_truth, predictions) in enumerate(zip(labels, all_predictions)):
             if gen_confusion_matrices:
-                prediction_list.append(predictions)
+                confusion.update(ground_truth, predictions)
             (
                 recall,
                 precision,
@@ -290,7 +473,7 @@ class TestImagingFrontend(unittest.TestCase):
                 letter_top5,
                 shape_color_top1,
                 letter_color_top1
-            ) = calc_metrics(predictions, ground_truth, debug_img= None, debug_path= debug_folder_path, img_num= img_counter) 
+            ) = calc_metrics(predictions, ground_truth, debug_img= None, debug_path= debug_folder_path, img_num= img_counter)
             img_counter += 1
 
             for metric, aggregate in zip(
@@ -299,10 +482,15 @@ class TestImagingFrontend(unittest.TestCase):
             ):
                 if not metric is None:
                     aggregate.append(metric)
-            
+
+            # Drop the decoded pixels and predictions as soon as they've
+            # been counted, keeping peak RSS flat in the dataset size.
+            imgs[i] = None
+            all_predictions[i] = None
+
         out_folder = f"{CURRENT_FILE_PATH}/visualizations/test_metrics"
         if gen_confusion_matrices:
-            generate_confusion_matrices(labels, prediction_list, out_folder)
+            confusion.finalize(out_folder)
 
         print(f"Recall: {np.mean(recalls)}")
         print(f"Precision: {np.mean(precisions)}")
@@ -318,7 +506,7 @@ class TestImagingFrontend(unittest.TestCase):
 
         if os.path.exists(debug_output_folder):
             shutil.rmtree(debug_output_folder)
-        image_processor = ImageProcessor(debug_output_folder, **kwargs)
+        image_processor = get_image_processor(debug_output_folder, **kwargs)
         imgs, labels = parse_str_dataset(f"{CURRENT_FILE_PATH}/2024_test_data/irl_dataset/images", f"{CURRENT_FILE_PATH}/2024_test_data/irl_dataset/labels")
         
         recalls = []
@@ -330,16 +518,13 @@ class TestImagingFrontend(unittest.TestCase):
         letter_color_top1s = []
         img_counter = 0
         
-        #Storing the predictions from pipeline for the confusion matrix evaluation
         if gen_confusion_matrices:
-            prediction_list = []
-
-        for img, ground_truth in zip(imgs, labels):
-            predictions = image_processor.process_image(img)
-            
+            confusion = ConfusionAccumulator()
 
+        all_predictions = image_processor.process_images(imgs)
+        for i, (ground_truth, predictions) in enumerate(zip(labels, all_predictions)):
             if gen_confusion_matrices:
-                prediction_list.append(predictions)
+                confusion.update(ground_truth, predictions)
             (
                 recall,
                 precision,
@@ -348,7 +533,7 @@ class TestImagingFrontend(unittest.TestCase):
                 letter_top5,
                 shape_color_top1,
                 letter_color_top1
-            ) = calc_metrics(predictions, ground_truth, debug_img= img.get_array(), debug_path= debug_output_folder, img_num= img_counter) 
+            ) = calc_metrics(predictions, ground_truth, debug_img= imgs[i].get_array(), debug_path= debug_output_folder, img_num= img_counter)
             img_counter += 1
 
             for metric, aggregate in zip(
@@ -357,11 +542,13 @@ class TestImagingFrontend(unittest.TestCase):
             ):
                 if not metric is None:
                     aggregate.append(metric)
-            
+
+            imgs[i] = None
+            all_predictions[i] = None
 
         out_folder = f"{CURRENT_FILE_PATH}/visualizations/test_irl"
         if gen_confusion_matrices:
-            generate_confusion_matrices(labels, prediction_list, out_folder)
+            confusion.finalize(out_folder)
 
         if verbose:
             print("\nIRL data metrics:\n")
@@ -384,14 +571,19 @@ class TestImagingFrontend(unittest.TestCase):
     def test_lightweight_process_many(self):
         # run lightweight assert there is multiple instances
         # assert the result is a list[fullbboxpred] and has numbers in prob_descriptors
-        image_processor = ImageProcessor()
-        sample_input = Image.from_file(f"{CURRENT_FILE_PATH}/2024_test_data/fullsize_dataset/images/1080p.png")
+        image_processor = self.image_processor
+        sample_input = sample_image()
         res = image_processor.process_image_lightweight(sample_input)
         
         assert type(res) is list
         assert type(res[0]) is FullBBoxPrediction
         if len(res) > 1:
-            assert np.any(res[0].descriptor.letter_probs) and np.any(res[0].descriptor.shape_col_probs)
+            # Probability distributions: non-empty with positive mass.
+            # (np.any on floats would also pass on an all-NaN array.)
+            letter_probs = res[0].descriptor.letter_probs
+            shape_col_probs = res[0].descriptor.shape_col_probs
+            assert letter_probs.size and float(letter_probs.sum()) > 0
+            assert shape_col_probs.size and float(shape_col_probs.sum()) > 0
 
 
 
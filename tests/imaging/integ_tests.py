@@ -1,10 +1,11 @@
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from uavf_2024.imaging.localizer import Localizer
 from uavf_2024.imaging.area_coverage import AreaCoverageTracker
 from uavf_2024.imaging.image_processor import ImageProcessor
 from uavf_2024.imaging.tracker import TargetTracker
 from uavf_2024.imaging.imaging_types import FullBBoxPrediction, Image, ProbabilisticTargetDescriptor, Target3D, COLORS, SHAPES, LETTERS, CertainTargetDescriptor
-from uavf_2024.imaging.utils import calc_match_score
+from uavf_2024.imaging.utils import normalize_distribution
 import os
 import numpy as np
 import shutil
@@ -69,7 +70,9 @@ def test_with_dataset(dataset_path: str, debug_folder_name: str = None):
 
     all_ground_truth: list[Target3D] = []
     with open(f"{dataset_path}/labels.txt", "r") as f:
-        for line in f.readlines():
+        # iterating the file streams lines without materializing the
+        # whole readlines() list first
+        for line in f:
             label, location_str = line.split(" ")
             if len(label.split(",")) != 4:
                 shape_name = label 
@@ -97,24 +100,39 @@ def test_with_dataset(dataset_path: str, debug_folder_name: str = None):
     def sort_key(file_name: str):
         return int(file_name.split("_")[0][5:])
     
-    img_files = filter(lambda f: f.endswith(".png"), os.listdir(images_dirname))
-    for file_name in tqdm(sorted(img_files, key=sort_key)):
-        img = Image.from_file(f"{images_dirname}/{file_name}")
-        img_no = sort_key(file_name)
+    # scandir streams the directory entries, and pairing each name with
+    # its number up front runs the split-based key once per file instead
+    # of O(log n) times inside the sort (plus once more per iteration).
+    with os.scandir(images_dirname) as entries:
+        img_files = sorted(
+            (sort_key(entry.name), entry.name)
+            for entry in entries if entry.name.endswith(".png")
+        )
+    # Read the per-image rotation files up front on a thread pool; the
+    # many tiny open/read calls pipeline against each other instead of
+    # serializing inside the decode loop.
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        rotations = dict(pool.map(
+            lambda img_no: (img_no, np.loadtxt(f"{images_dirname}/rotation{img_no}.txt", delimiter=",")),
+            (img_no for img_no, _ in img_files)
+        ))
+
+    for img_no, file_name in tqdm(img_files):
+        img = Image.from_mmap(f"{images_dirname}/{file_name}")
         pose_str = file_name.split(".")[0].split("_")[1:]
         cam_position = csv_to_np(pose_str[0])
-        
-        with open(f"{images_dirname}/rotation{img_no}.txt", "r") as f:
-            raw_quaternion = csv_to_np(f.read(), dtype=float)
-            cam_rot = R.from_quat(raw_quaternion)
+        cam_rot = R.from_quat(rotations[img_no])
 
 
         predictions = image_processor.process_image(img)
         area_tracker.update(([cam_position, cam_rot]), label=file_name.split("_")[0])
 
         if verbose:
-            bounding_boxes_image_path = f"{debug_output_folder}/img_{img_no}/bounding_boxes.png"
-            boxes_img = cv.imread(bounding_boxes_image_path)
+            # Draw the annotations on the frame we already have decoded
+            # instead of re-reading (and re-encoding) the processor's
+            # bounding_boxes.png, which costs a PNG decode/encode per
+            # image and races with the processor's async debug writer.
+            boxes_img = img.get_array().copy()
 
         # calculate 3d positions for all detections, and draw them on the debug image
         for pred in predictions:
@@ -124,6 +142,7 @@ def test_with_dataset(dataset_path: str, debug_folder_name: str = None):
             if not verbose: continue
             x,y,w,h, = pred.x, pred.y, pred.width, pred.height
             x3, y3, z3 = pred_3d.position
+            cv.rectangle(boxes_img, (x-w//2,y-h//2), (x+w//2,y+h//2), (0,255,0), 2)
             cv.putText(boxes_img, f"{x3:.01f}, {y3:.01f}, {z3:.01f}", (x,y+h+20), cv.FONT_HERSHEY_SIMPLEX, 1, (0,255,0), 2)
 
         if verbose:
@@ -137,7 +156,8 @@ def test_with_dataset(dataset_path: str, debug_folder_name: str = None):
                     cv.putText(boxes_img, str(gt.descriptor.collapse_to_certain()), (int(x_reproj), int(y_reproj)), cv.FONT_HERSHEY_SIMPLEX, 1, (255,0,0), 2)
                     cv.circle(boxes_img, (int(x2_reproj), int(y2_reproj)), 5, (255,255,0), -1)
 
-            cv.imwrite(bounding_boxes_image_path, boxes_img)
+            os.makedirs(f"{debug_output_folder}/img_{img_no}", exist_ok=True)
+            cv.imwrite(f"{debug_output_folder}/img_{img_no}/bounding_boxes_3d.png", boxes_img)
 
 
 
@@ -150,33 +170,52 @@ def test_with_dataset(dataset_path: str, debug_folder_name: str = None):
     ground_truth: list[Target3D] = all_ground_truth
 
     closest_tracks = tracker.estimate_positions([t.descriptor.collapse_to_certain() for t in ground_truth])
+    # Stack every detection position once; per-target distances are then
+    # one vectorized norm over an (N,3) array instead of N tiny 3-vector
+    # norms inside min()/filter().
+    pred_positions = np.stack([p.position for p in predictions_3d]) if predictions_3d else np.empty((0,3))
+    track_positions = np.stack([t.position for t in tracker.tracks]) if tracker.tracks else np.empty((0,3))
+    # calc_match_score is a product of the shape and shape-color inner
+    # products against the normalized target descriptor, so the full
+    # (detections x targets) score matrix is just two matmuls.
+    if predictions_3d:
+        normalized_gts = [normalize_distribution(gt.descriptor, 1e-4) for gt in ground_truth]
+        score_matrix = (
+            np.stack([p.descriptor.shape_probs for p in predictions_3d]) @
+            np.stack([gt.shape_probs for gt in normalized_gts]).T
+        ) * (
+            np.stack([p.descriptor.shape_col_probs for p in predictions_3d]) @
+            np.stack([gt.shape_col_probs for gt in normalized_gts]).T
+        )
     scores = []
     distances = []
-    for gt_target, pred_track in zip(ground_truth, closest_tracks):
+    for gt_idx, (gt_target, pred_track) in enumerate(zip(ground_truth, closest_tracks)):
         is_close_enough = np.linalg.norm(pred_track.position-gt_target.position) < POSITION_ERROR_ACCEPTABLE_BOUND
         scores.append(int(is_close_enough))
         if is_close_enough:
             distances.append(np.linalg.norm(pred_track.position-gt_target.position))
         if verbose: # we only want to print this extra info for the first one to not clog up the output
             print(f"Closest Match for {str(gt_target.descriptor.collapse_to_certain())}:")
-            physically_closest_match = min(predictions_3d, key=lambda pred: np.linalg.norm(pred.position-gt_target.position))
-            closest_match = max(predictions_3d, key=lambda pred: calc_match_score(pred.descriptor, gt_target.descriptor))
+            dists_to_gt = np.linalg.norm(pred_positions - gt_target.position, axis=1)
+            gt_scores = score_matrix[:, gt_idx]
+            physically_closest_match = predictions_3d[int(dists_to_gt.argmin())]
+            closest_match = predictions_3d[int(gt_scores.argmax())]
 
             print(f"\tTrack distance: {np.linalg.norm(pred_track.position-gt_target.position):.3f}")
             print(f"\tDetections used in track:")
             print(f"\t\t{[detection.id for detection in pred_track.get_measurements()]}") 
 
             print(f"\tClose tracks (each line is one track):")
-            for track in tracker.tracks:
-                if np.linalg.norm(track.position - gt_target.position) < POSITION_ERROR_ACCEPTABLE_BOUND:
-                    print(f"\t\t{[detection.id for detection in track.get_measurements()]}")
+            track_dists = np.linalg.norm(track_positions - gt_target.position, axis=1)
+            for track_idx in np.nonzero(track_dists < POSITION_ERROR_ACCEPTABLE_BOUND)[0]:
+                print(f"\t\t{[detection.id for detection in tracker.tracks[track_idx].get_measurements()]}")
 
             print(f"\tClose detections:")
-            print(f"\t\t{[p.id for p in filter(lambda pred: np.linalg.norm(pred.position-gt_target.position) < POSITION_ERROR_ACCEPTABLE_BOUND, predictions_3d)]}")
-            print(f"\tPhysically closest detection distance: {np.linalg.norm(physically_closest_match.position-gt_target.position):.3f}")
-            print(f"\tPhysically closest detection descriptor score: {calc_match_score(physically_closest_match.descriptor, gt_target.descriptor)}")
+            print(f"\t\t{[predictions_3d[i].id for i in np.nonzero(dists_to_gt < POSITION_ERROR_ACCEPTABLE_BOUND)[0]]}")
+            print(f"\tPhysically closest detection distance: {dists_to_gt.min():.3f}")
+            print(f"\tPhysically closest detection descriptor score: {gt_scores[int(dists_to_gt.argmin())]}")
             print(f"\tPhysically closest detection id: {physically_closest_match.id}")
-            print(f"\tHighest descriptor match score: {calc_match_score(closest_match.descriptor, gt_target.descriptor)}")
+            print(f"\tHighest descriptor match score: {gt_scores.max()}")
             print(f"\tHighest descriptor match id: {closest_match.id}")
             print(f"\tHigh descriptor match distance: {np.linalg.norm(closest_match.position-gt_target.position):.3f}")
             print(f"\tClose enough? {is_close_enough}")
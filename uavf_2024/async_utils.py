@@ -1,11 +1,11 @@
 from abc import abstractmethod
 from collections import deque
+from itertools import count
 import logging
 import os
 from pathlib import Path
-import random
+import queue
 import threading
-import time
 from typing import Any, Callable, Generic, TypeVar
 
 from rclpy.node import Node
@@ -14,6 +14,8 @@ class OnceCallable():
     """
     Runs the given function only the first time it's called and do nothing for subsequent invocations.
     """
+    __slots__ = ("_func", "_called")
+
     def __init__(self, func: Callable):
         self._func = func
         self._called = False
@@ -28,13 +30,20 @@ class OnceCallable():
 
 BufItemT = TypeVar("BufItemT")
 class AsyncBuffer(Generic[BufItemT]):
+    # Slots skip the per-instance __dict__ and make the hot-path
+    # attribute loads C-level slot lookups.
+    __slots__ = ("_capacity", "_queue", "lock")
+
     def __init__(self, capacity: int = 4):
         if capacity < 1:
             raise ValueError(f"Buffer capacity cannot be less than 1. Got {capacity}")
         self._capacity = capacity
         self._queue: deque[BufItemT] = deque(maxlen=self.capacity)
-        
-        # Lock for the whole queue. 
+
+        # Only the multi-item snapshots (get_all*) take this lock.
+        # Single append/index operations on a bounded deque are atomic
+        # under the GIL, so the high-rate put/get_fresh paths skip the
+        # acquire/release pair entirely.
         self.lock = threading.Lock()
         
     @property
@@ -49,11 +58,10 @@ class AsyncBuffer(Generic[BufItemT]):
         return bool(self.count)
     
     def put(self, datum: BufItemT):
-        with self.lock:
-            # If the queue is too long, it'll automatically discard 
-            # the item at the other end.
-            self._queue.append(datum)
-        
+        # If the queue is too long, it'll automatically discard
+        # the item at the other end.
+        self._queue.append(datum)
+
     def get_fresh(self, offset: int = 0):
         """
         Gets the item at the freshness offset specified (if specified).
@@ -61,18 +69,22 @@ class AsyncBuffer(Generic[BufItemT]):
         """
         if offset < 0:
             raise ValueError(f"Offset cannot be less than 0. Got {offset}")
-        
-        with self.lock:
-            return self._queue[-(offset + 1)]
+
+        return self._queue[-(offset + 1)]
     
     def get_all(self) -> list[BufItemT]:
         """
         Returns all items in the buffer in the order of freshest first.
-        
+
         Can be useful if we want a more refined search.
         """
+        # list(deque) is a straight presized copy; reversing in place
+        # afterwards avoids iterating the deque through the reversed()
+        # wrapper and shrinks the locked region to just the copy.
         with self.lock:
-            return list(reversed(self._queue))
+            items = list(self._queue)
+        items.reverse()
+        return items
         
     def get_all_reversed(self) -> list[BufItemT]:
         """
@@ -90,19 +102,22 @@ class Subscriptions(Generic[InputT]):
     This class can be used in the future to subsume ROS' subscription
     functionality when we stay within Python.
     """
+    __slots__ = ("_callbacks", "_id_counter", "lock")
+
     def __init__(self):
-        self._callbacks: dict[float, Callable[[InputT], Any]] = {}
+        self._callbacks: dict[int, Callable[[InputT], Any]] = {}
+        self._id_counter = count()
         self.lock = threading.Lock()
-    
+
     def add(self, callback: Callable[[InputT], Any]) -> Callable[[], None]:
         """
         Adds the callback to the collection of subscriptions to be called
         when there is a notification.
-        
+
         Returns a function to unsubscribe.
         """
-        subscription_id = random.random()
-        
+        subscription_id = next(self._id_counter)
+
         with self.lock:
             def unsubscribe():
                 del self._callbacks[subscription_id]
@@ -114,26 +129,35 @@ class Subscriptions(Generic[InputT]):
     def notify(self, new_value: InputT):
         """
         Calls all of the callbacks with the new value.
-        
-        Locks so that subscriptions will have to wait after a round of notifications.
+
+        The callback collection is snapshotted under the lock but the
+        callbacks run outside it, so a slow callback doesn't block
+        subscribe/unsubscribe (or deadlock a callback that subscribes).
+        Callbacks added mid-notify are picked up from the next round.
         """
         with self.lock:
-            for callback in self._callbacks.values():
-                callback(new_value)
+            callbacks = list(self._callbacks.values())
+        for callback in callbacks:
+            callback(new_value)
 
 
 MessageT = TypeVar("MessageT")
 LoggingBufferT = TypeVar("LoggingBufferT")
+
+# Hands out unique default logger indices. itertools.count is atomic
+# under the GIL, unlike the read-modify-write on a class attribute it
+# replaces, so concurrently constructed providers can't end up sharing
+# a logger name (and doubling its output).
+_logger_counter = count()
+
 class RosLoggingProvider(Generic[MessageT, LoggingBufferT]):
     """
     Provider wrapping a ROS topic subscription to automatically log files as well as providing
     a getter and subscription mechanism.
-    
-    The only method that need to be overidden are 
+
+    The only method that need to be overidden are
     """
-    
-    LOGGER_INDEX = 0
-    
+
     def __init__(
         self, 
         node_context: Node,
@@ -153,10 +177,9 @@ class RosLoggingProvider(Generic[MessageT, LoggingBufferT]):
         
         # Initialize logger
         if logger_name:
-            self.logger = logging.getLogger()
+            self.logger = logging.getLogger(logger_name)
         else:
-            self.logger = logging.getLogger("RosLoggingProvider" + str(__class__.LOGGER_INDEX))
-            __class__.LOGGER_INDEX += 1
+            self.logger = logging.getLogger(f"RosLoggingProvider{next(_logger_counter)}")
         
         if logger is not None:
             self.logger = logger
@@ -172,8 +195,18 @@ class RosLoggingProvider(Generic[MessageT, LoggingBufferT]):
             elif not self._logs_dir.is_dir():
                 raise FileExistsError(f"{self._logs_dir} exists but is not a directory")
         
-        self._buffer: AsyncBuffer[LoggingBufferT] = AsyncBuffer(buffer_size)
-        
+        self._buffer = self._make_buffer(buffer_size)
+
+        # Set once when the first datum lands, so waiters block on the
+        # event instead of polling the buffer.
+        self._first_data_event = threading.Event()
+
+        # File logging happens on a background thread fed by this queue so
+        # the subscription callback never blocks on disk I/O.
+        self._logs_queue: queue.Queue[LoggingBufferT] = queue.Queue()
+        self._log_thread = threading.Thread(target=self._log_worker, daemon=True)
+        self._log_thread.start()
+
         self._subscribe_to_topic(self._handle_update)
         
         self.log(f"Finished intializing RosLoggingProvider. Logging to {self._logs_dir}")
@@ -188,6 +221,16 @@ class RosLoggingProvider(Generic[MessageT, LoggingBufferT]):
         elif not self._logs_dir.is_dir():
             raise FileExistsError(f"{self._logs_dir} exists but is not a directory")
 
+    def _make_buffer(self, buffer_size: int) -> AsyncBuffer[LoggingBufferT]:
+        """
+        Factory for the internal buffer.
+
+        Subclasses can override this to substitute a specialized buffer
+        exposing the same interface, e.g. one with a message-specific
+        memory layout.
+        """
+        return AsyncBuffer(buffer_size)
+
     @abstractmethod
     def _subscribe_to_topic(self, action: Callable[[MessageT], Any]) -> None:
         """
@@ -232,18 +275,31 @@ class RosLoggingProvider(Generic[MessageT, LoggingBufferT]):
     def get_logs_dir(self):
         return self._logs_dir
         
+    def _log_worker(self):
+        """
+        Drains the logging queue, writing each item to disk off the
+        subscription callback thread.
+        """
+        while True:
+            item = self._logs_queue.get()
+            try:
+                self.log_to_file(item)
+            except Exception as e:
+                self.log(f"Failed to log item to file: {e}", logging.ERROR)
+
     def _handle_update(self, item: MessageT):
         formatted: LoggingBufferT = self.format_data(item)
-        
+
         if not self._first_value:
             self._first_value = formatted
-            
+
         self._buffer.put(formatted)
+        self._first_data_event.set()
         self._subscribers.notify(formatted)
-        
+
         if self._logs_dir is not None:
-            self.log_to_file(formatted)
-        
+            self._logs_queue.put(formatted)
+
     def get_first_datum(self):
         """
         Get the first formatted datum received by this provider.
@@ -264,10 +320,6 @@ class RosLoggingProvider(Generic[MessageT, LoggingBufferT]):
         """
         Waits until the first datum is added to the buffer.
         """
-        start = time.time()
-        
-        while self._buffer.count == 0:
-            if time.time() - start >= timeout_seconds:
-                raise TimeoutError("Timed out waiting for datum")
-            
-            time.sleep(0.1)
+        timeout = None if timeout_seconds == float('inf') else timeout_seconds
+        if not self._first_data_event.wait(timeout):
+            raise TimeoutError("Timed out waiting for datum")
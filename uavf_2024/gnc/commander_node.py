@@ -1,5 +1,7 @@
 from concurrent.futures import Future, as_completed
+import copy
 from datetime import datetime
+import threading
 import time
 import logging
 from pathlib import Path
@@ -18,7 +20,7 @@ import sensor_msgs.msg
 import geometry_msgs.msg 
 import libuavf_2024.srv
 
-from uavf_2024.gnc.util import pose_to_xy, convert_delta_gps_to_local_m, convert_local_m_to_delta_gps, read_payload_list, read_gpx_file, validate_points
+from uavf_2024.gnc.util import pose_to_xy, convert_delta_gps_to_local_m, convert_delta_gps_to_local_m_batch, convert_local_m_to_delta_gps, read_payload_list, read_gpx_file, validate_points
 from uavf_2024.gnc.dropzone_planner import DropzonePlanner
 from uavf_2024.gnc.mission_messages import *
 
@@ -26,18 +28,6 @@ from uavf_2024.imaging import Perception, PoseProvider, Target3D
 
 TAKEOFF_ALTITUDE = 25.0
 
-from concurrent.futures import Future
-
-def immediate_future(value):
-  """
-  Creates a Future object that resolves immediately to the provided value.
-  """
-  # Create a Future object
-  future = Future()
-  # Set the result of the Future object
-  future.set_result(value)
-  return future
-
 class CommanderNode(rclpy.node.Node):
     '''
     Manages subscriptions to ROS2 topics and services necessary for the main GNC node. 
@@ -50,10 +40,13 @@ class CommanderNode(rclpy.node.Node):
         logging.basicConfig(filename='commander_node_{:%Y-%m-%d-%m-%s}.log'.format(datetime.now()), format='%(asctime)s %(message)s', encoding='utf-8', level=logging.DEBUG)
         logging.getLogger().addHandler(logging.StreamHandler())
 
+        # KEEP_LAST honors depth=1; KEEP_ALL made the middleware queue
+        # every unread message, so stale state/reached messages could
+        # pile up between executor wakeups
         qos_profile = QoSProfile(
             reliability=ReliabilityPolicy.BEST_EFFORT,
             durability=DurabilityPolicy.VOLATILE,
-            history=HistoryPolicy.KEEP_ALL,
+            history=HistoryPolicy.KEEP_LAST,
             depth = 1)
 
 
@@ -79,6 +72,15 @@ class CommanderNode(rclpy.node.Node):
             qos_profile
         )
 
+        # Events set from the subscription callbacks so mission code can
+        # block on them instead of burning a core in `while not x: pass`
+        # loops (which also starve the executor running the callbacks).
+        self.got_pose_event = threading.Event()
+        self.got_global_pos_event = threading.Event()
+        self.got_home_pos_event = threading.Event()
+        self.mission_done_event = threading.Event()
+        self.mission_final_wp_seq = None
+
         self.cur_state = None
         self.state_sub = self.create_subscription(
             mavros_msgs.msg.State,
@@ -91,14 +93,14 @@ class CommanderNode(rclpy.node.Node):
             geometry_msgs.msg.PoseStamped,
             '/mavros/local_position/pose',
             self.got_pose_cb,
-            qos_profile)
+            qos_profile_sensor_data)
 
         self.got_global_pos = False
         self.global_position_sub = self.create_subscription(
             sensor_msgs.msg.NavSatFix,
             '/mavros/global_position/global',
             self.got_global_pos_cb,
-            qos_profile)
+            qos_profile_sensor_data)
 
         self.last_wp_seq = -1
         self.reached_sub = self.create_subscription(
@@ -151,6 +153,10 @@ class CommanderNode(rclpy.node.Node):
         self.timer_period = 0.1  # seconds
         self.create_timer(self.timer_period, self.timer_cb, timer_cb_group)
 
+        # own group so mode-setting retry timers can fire while mission
+        # code blocks waiting on them
+        self.mode_timer_cb_group = MutuallyExclusiveCallbackGroup()
+
     def timer_cb(self):
         timestamp = time.time()
         if self.call_imaging_at_wps and (self.last_imaging_time is None or timestamp - self.last_imaging_time > 0.3):
@@ -170,26 +176,42 @@ class CommanderNode(rclpy.node.Node):
         if reached.wp_seq > self.last_wp_seq:
             self.log(f"Reached waypoint {reached.wp_seq}")
             self.last_wp_seq = reached.wp_seq
+            if self.mission_final_wp_seq is not None and self.last_wp_seq >= self.mission_final_wp_seq:
+                self.mission_done_event.set()
             if self.call_imaging_at_wps:
                 self.do_imaging_call()
 
     def do_imaging_call(self):
-        # self.perception_futures.append(self.perception.get_image_down_async())
-        self.perception_futures.append(immediate_future(self.perception.get_image_down()))
+        # the async path runs inference on Perception's own pool, so the
+        # timer/reached callbacks return immediately instead of blocking
+        # the executor for the whole capture+inference
+        self.perception_futures.append(self.perception.get_image_down_async())
     
     def got_pose_cb(self, pose):
         self.cur_pose = pose
-        self.cur_rot = R.from_quat([pose.pose.orientation.x,pose.pose.orientation.y,pose.pose.orientation.z,pose.pose.orientation.w,]).as_rotvec()
         self.got_pose = True
+        self.got_pose_event.set()
         if not self.got_home_local_pos:
             self.got_home_local_pos = True
             self.home_local_pose = self.cur_pose
             self.log(f"home local pose is {self.home_local_pose}")
 
+    @property
+    def cur_rot(self):
+        '''
+        Rotation vector of the latest pose. Converted lazily on access:
+        the pose topic runs at tens of Hz and nothing needs the rotvec
+        per message, so the scipy conversion shouldn't be paid in the
+        subscription callback.
+        '''
+        orientation = self.cur_pose.pose.orientation
+        return R.from_quat([orientation.x, orientation.y, orientation.z, orientation.w]).as_rotvec()
+
     def got_global_pos_cb(self, pos):
         #Todo this feels messy - there should be a cleaner way to get home-pos through MAVROS.
         self.last_global_pos = pos
         self.got_global_pos = True
+        self.got_global_pos_event.set()
 
 
     def home_position_cb(self, pos):
@@ -197,6 +219,7 @@ class CommanderNode(rclpy.node.Node):
             self.log(f"home pos is {pos}")
         self.home_pos = pos
         self.got_home_pos = True
+        self.got_home_pos_event.set()
     
     def status_text_cb(self, statustext):
         self.log(f"recieved statustext: {statustext}")
@@ -214,7 +237,35 @@ class CommanderNode(rclpy.node.Node):
 
     def get_cur_xy(self):
         return pose_to_xy(self.cur_pose)
-    
+
+    def set_mode_with_retries(self, custom_mode, timeout_seconds = 200.0):
+        '''
+        Requests the given mode on a 0.2s ROS timer until the FCU reports
+        it, then returns True (False on timeout). mavros/px4 doesn't
+        consistently set the mode on the first request, and the old
+        retry loop issued blocking calls with sleeps on the mission
+        thread; call_async from a timer callback keeps the executor
+        responsive in between.
+        '''
+        done_event = threading.Event()
+        request = mavros_msgs.srv.SetMode.Request(base_mode = 0, custom_mode = custom_mode)
+
+        def retry_cb():
+            # last_wp_seq >= 0 means the FCU reported mission progress, so
+            # the mode took even if cur_state hasn't caught up yet
+            if (self.cur_state != None and self.cur_state.mode == custom_mode) or self.last_wp_seq >= 0:
+                timer.cancel()
+                done_event.set()
+                return
+            self.mode_client.call_async(request)
+
+        timer = self.create_timer(0.2, retry_cb, self.mode_timer_cb_group)
+        success = done_event.wait(timeout_seconds)
+        timer.cancel()
+        self.destroy_timer(timer)
+        return success
+
+
     def execute_waypoints(self, waypoints, yaws = None, do_set_mode=True):
         if yaws is None:
             yaws = [float('NaN')] * len(waypoints)
@@ -226,23 +277,28 @@ class CommanderNode(rclpy.node.Node):
         yaws = [float('NaN')] + yaws
         self.log(f"Waypoints: {waypoints} Yaws: {yaws}")
 
-        waypoint_msgs = [
-                mavros_msgs.msg.Waypoint(
-                    frame = mavros_msgs.msg.Waypoint.FRAME_GLOBAL_REL_ALT,
-                    command = mavros_msgs.msg.CommandCode.NAV_WAYPOINT,
-                    is_current = False,
-                    autocontinue = True,
-
-                    param1 = 0.0,
-                    param2 = 5.0,
-                    param3 = 0.0,
-                    param4 = yaw,
-
-                    x_lat = wp[0],
-                    y_long = wp[1],
-                    z_alt = wp[2])
-
-                for wp,yaw in zip(waypoints, yaws)]
+        # constant fields go into one template; per-point messages are
+        # shallow copies with only the varying fields assigned, skipping
+        # the full keyword constructor (which type-checks every field)
+        # for each waypoint of a potentially hundreds-long sweep
+        wp_template = mavros_msgs.msg.Waypoint(
+            frame = mavros_msgs.msg.Waypoint.FRAME_GLOBAL_REL_ALT,
+            command = mavros_msgs.msg.CommandCode.NAV_WAYPOINT,
+            is_current = False,
+            autocontinue = True,
+
+            param1 = 0.0,
+            param2 = 5.0,
+            param3 = 0.0)
+
+        waypoint_msgs = []
+        for wp, yaw in zip(waypoints, yaws):
+            msg = copy.copy(wp_template)
+            msg.param4 = float(yaw)
+            msg.x_lat = float(wp[0])
+            msg.y_long = float(wp[1])
+            msg.z_alt = float(wp[2])
+            waypoint_msgs.append(msg)
 
         
         self.clear_mission_client.call(mavros_msgs.srv.WaypointClear.Request())
@@ -255,21 +311,15 @@ class CommanderNode(rclpy.node.Node):
         self.log("Delaying before resetting mission progress.")
         time.sleep(.5)
         self.last_wp_seq = -1
+        self.mission_done_event.clear()
+        self.mission_final_wp_seq = len(waypoints)-1
         self.log("Set mission progress")
         if do_set_mode:
             self.log("Delaying before setting mode.")
             time.sleep(.5)
             self.log("Setting mode.")
-            # mavros/px4 doesn't consistently set the mode the first time this function is called...
-            # retry or fail the script.
-            for _ in range(1000):
-                self.mode_client.call(mavros_msgs.srv.SetMode.Request( \
-                    base_mode = 0,
-                    custom_mode = 'AUTO.MISSION'))
-                time.sleep(0.05)
-                if (self.cur_state != None and self.cur_state.mode == 'AUTO.MISSION') or self.last_wp_seq >= -1:
-                    self.log("Success setting mode")
-                    break
+            if self.set_mode_with_retries('AUTO.MISSION'):
+                self.log("Success setting mode")
             else:
                 self.log("Failure setting mode, quitting.")
                 quit()
@@ -278,8 +328,8 @@ class CommanderNode(rclpy.node.Node):
 
         self.log("Waiting for mission to finish.")
 
-        while self.last_wp_seq != len(waypoints)-1:
-            pass
+        self.mission_done_event.wait()
+        self.mission_final_wp_seq = None
     
     def release_payload(self):
         deg1 = 180
@@ -373,8 +423,8 @@ class CommanderNode(rclpy.node.Node):
             time.sleep(0.05)
 
     def execute_mission_loop(self):
-        while not self.got_global_pos or not self.got_home_pos:
-            pass
+        self.got_global_pos_event.wait()
+        self.got_home_pos_event.wait()
 
         if self.args.demo_setpoint_loop:
             self.demo_setpoint_loop()
@@ -394,7 +444,12 @@ class CommanderNode(rclpy.node.Node):
                 time.sleep(self.args.call_imaging_period)
 
         self.request_load_payload(self.payloads[0])
-        self.dropzone_bounds_mlocal = [self.gps_to_local(x) for x in self.dropzone_bounds]
+        # one vectorized conversion for all four corners instead of two
+        # iterative geodesic solves per corner
+        self.dropzone_bounds_mlocal = convert_delta_gps_to_local_m_batch(
+            (self.home_pos.geo.latitude, self.home_pos.geo.longitude),
+            self.dropzone_bounds
+        ) + pose_to_xy(self.home_local_pose)
         self.log(f"dropzone bounds = {self.dropzone_bounds_mlocal}")
         for lap in range(len(self.payloads)):
             if lap > 0:
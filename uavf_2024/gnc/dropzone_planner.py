@@ -30,17 +30,19 @@ class DropzonePlanner:
 
         # Step 1: Find closest corner of dropzone.
         # Set up some helpers to reorient relative to that.
-        while not self.commander.got_global_pos or not self.commander.got_pose:
-            pass
+        self.commander.got_global_pos_event.wait()
+        self.commander.got_pose_event.wait()
 
-        dropzone_coords = self.commander.dropzone_bounds_mlocal
+        dropzone_coords = np.asarray(self.commander.dropzone_bounds_mlocal)
 
         cur_xy = self.commander.get_cur_xy()
         self.commander.log(f"bounds: {dropzone_coords}")
         self.commander.log(f"homepos: {self.commander.home_pos}")
         self.commander.log(f"current xy: {cur_xy}")
 
-        closest_idx = min(range(4), key = lambda i: np.linalg.norm(dropzone_coords[i] - cur_xy))
+        # one vectorized norm over the (4,2) corner array instead of a
+        # Python min() with a key computing each norm separately
+        closest_idx = int(np.linalg.norm(dropzone_coords - cur_xy, axis=1).argmin())
 
         self.commander.log(f"Closest corner is {dropzone_coords[closest_idx]}")
         self.commander.log(f"GPS: {self.commander.local_to_gps(dropzone_coords[closest_idx])}")
@@ -66,35 +68,36 @@ class DropzonePlanner:
         self.commander.log(f"Dropzone dimensions are {drop_h}x{drop_w}")
         self.commander.log(f"Dropzone unit vectors are {w_unit} and {h_unit}")
 
-        fwd_yaw = np.degrees(np.arccos(np.dot(np.array([1,0]), h_unit)))
+        # atan2 gives the signed heading; arccos of the dot with [1,0]
+        # folded +y and -y directions together (and is unstable near 0/180)
+        fwd_yaw = np.degrees(np.arctan2(h_unit[1], h_unit[0]))
         fwd_yaw += 90
         fwd_yaw %= 360
 
-        side_yaw = np.degrees(np.arccos(np.dot(np.array([1,0]), w_unit)))
+        side_yaw = np.degrees(np.arctan2(w_unit[1], w_unit[0]))
         side_yaw -= 90
         side_yaw %= 360
         
         # Step 2: Generate a "zigzag" pattern to sweep the entire dropzone.
+        # Broadcast the whole (ncols, nrows, 2) sweep grid in one go
+        # instead of building each waypoint in a nested Python loop.
+        ncols = math.ceil(drop_w/self.image_width_m)
+        nrows = math.ceil(drop_h/self.image_height_m)
+        offsets_w = self.image_width_m * (np.arange(ncols) + 1/2)
+        offsets_h = self.image_height_m * (np.arange(nrows) + 1/2)
+        grid = dropzone_coords[closest_idx] \
+            + offsets_w[:,None,None] * w_unit \
+            + offsets_h[None,:,None] * h_unit
+        # odd columns sweep back the other way
+        grid[1::2] = grid[1::2, ::-1]
+
         result_wps = []
-        for col in range(math.ceil(drop_w/self.image_width_m)):
-            wps_col = []
-
-            offset_w = self.image_width_m * (col + 1/2)
-            for row in range(math.ceil(drop_h/self.image_height_m)):
-                offset_h = self.image_height_m * (row + 1/2)
-
-                wps_col.append(dropzone_coords[closest_idx] + w_unit * offset_w + h_unit * offset_h)
-            
-            if col % 2:
-                wps_col = [(x, (fwd_yaw + 180)%360) for x in wps_col[::-1]]
-            else:
-                wps_col = [(x, fwd_yaw) for x in wps_col]
-            
+        for col in range(ncols):
+            yaw = (fwd_yaw + 180)%360 if col % 2 else fwd_yaw
             # add intermediate WP to guide PX4 to make the right turn
             if col > 0:
-                fx,_ = wps_col[0]
-                result_wps.append((fx,(side_yaw if col % 2 else -side_yaw)))
-            result_wps += wps_col
+                result_wps.append((grid[col,0], (side_yaw if col % 2 else -side_yaw)))
+            result_wps += [(wp, yaw) for wp in grid[col]]
 
         return result_wps
 
@@ -106,11 +109,14 @@ class DropzonePlanner:
         '''
         dropzone_plan = self.gen_dropzone_plan()
 
+        # convert once; logging and execute_waypoints share the same list
+        # instead of re-running the geodesic solve per waypoint
+        gps_wps = [self.commander.local_to_gps(wp) for wp, _ in dropzone_plan]
         self.commander.log(f"Local coords: {dropzone_plan}")
-        self.commander.log(f"Planned waypoints: {[self.commander.local_to_gps(wp) for wp, _ in dropzone_plan]}")
+        self.commander.log(f"Planned waypoints: {gps_wps}")
 
         self.commander.call_imaging_at_wps = True
-        dropzone_wps = [np.concatenate((self.commander.local_to_gps(wp), np.array([altitude]))) for wp, yaw in dropzone_plan]
+        dropzone_wps = [np.concatenate((gps_wp, np.array([altitude]))) for gps_wp in gps_wps]
         dropzone_yaws = [yaw for wp, yaw in dropzone_plan]
         dropzone_wps = [dropzone_wps[0]] + dropzone_wps
         dropzone_yaws = [float('NaN')] + dropzone_yaws
@@ -1,20 +1,45 @@
 from geographiclib.geodesic import Geodesic
 import gpxpy
 import gpxpy.gpx
-import math
 import numpy as np
 from shapely.geometry import Point, Polygon
 from uavf_2024.imaging import CertainTargetDescriptor
 
+# resolved once; Geodesic.WGS84 goes through class-level attribute
+# machinery on every access
+_GEOD = Geodesic.WGS84
+
 def read_gps(fname):
-    with open(fname) as f:
-        return [tuple(map(float, line.split(','))) for line in f]
+    # one C-side parse instead of tokenizing every line in Python;
+    # returned as rows so callers keep list semantics (e.g. wpts +
+    # [wpts[0]] appends rather than broadcast-adds)
+    return np.loadtxt(fname, delimiter=',', dtype=np.float64, ndmin=2).tolist()
 
 def is_point_within_fence(point, geofence):
     fence_polygon = Polygon(geofence)
     point = Point(point)
     return fence_polygon.contains(point)
 
+def points_in_polygon(xs, ys, poly_xs, poly_ys):
+    '''
+    Vectorized ray-casting point-in-polygon test. One pass per polygon
+    edge over all points at once, with no per-point shapely/GEOS
+    round trips.
+    '''
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    inside = np.zeros(xs.shape, dtype=bool)
+    j = len(poly_xs) - 1
+    # horizontal edges make the crossing x divide by zero, but `crosses`
+    # masks those lanes out, so silence the warning
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for i in range(len(poly_xs)):
+            crosses = (poly_ys[i] > ys) != (poly_ys[j] > ys)
+            x_at_y = (poly_xs[j]-poly_xs[i])*(ys-poly_ys[i])/(poly_ys[j]-poly_ys[i]) + poly_xs[i]
+            inside ^= crosses & (xs < x_at_y)
+            j = i
+    return inside
+
 def validate_points(point_list, geofence, has_altitudes = True):
     for point in point_list:
         if has_altitudes:
@@ -22,7 +47,11 @@ def validate_points(point_list, geofence, has_altitudes = True):
             assert point[2] > 0, "ERROR: Altitude must be greater than 0."
         else:
             assert len(point) == 2
-        assert is_point_within_fence((point[0], point[1]), geofence), "ERROR: Point is not within Geofence."
+    pts = np.array([(point[0], point[1]) for point in point_list], dtype=np.float64)
+    fence = np.asarray(geofence, dtype=np.float64)
+    if len(pts):
+        inside = points_in_polygon(pts[:,0], pts[:,1], fence[:,0], fence[:,1])
+        assert inside.all(), "ERROR: Point is not within Geofence."
     return
 
 def read_payload_list(fname):
@@ -97,36 +126,45 @@ def convert_delta_gps_to_local_m(gp1, gp2):
     # s12 is the distance.
 
 
-    geod = Geodesic.WGS84
-    g0 = geod.Inverse(*gp1, gp2[0], gp1[1])
-    g1 = geod.Inverse(gp2[0], gp1[1], *gp2)
+    g0 = _GEOD.Inverse(*gp1, gp2[0], gp1[1])
+    g1 = _GEOD.Inverse(gp2[0], gp1[1], *gp2)
     return np.array([g1['s12']*(1 if g1['azi1'] > 0 else -1), g0['s12']*(-1 if g0['azi1'] > 90 else 1)])
 
+def convert_delta_gps_to_local_m_batch(gp0, gps_array):
+    '''
+    Batched `convert_delta_gps_to_local_m` using a flat-earth
+    linearization around `gp0`. The meters-per-degree factors are
+    calibrated with two geodesic solves at `gp0` (instead of two per
+    point), so the linearization matches the geodesic result to within
+    a few centimeters at dropzone scales.
+    '''
+    gps_array = np.asarray(gps_array, dtype=np.float64)
+    lat0, lon0 = float(gp0[0]), float(gp0[1])
+    # ~100m baseline centered on gp0 for the finite differences
+    ddeg = 1e-3
+    m_per_deg_lat = _GEOD.Inverse(lat0 - ddeg/2, lon0, lat0 + ddeg/2, lon0)['s12'] / ddeg
+    m_per_deg_lon = _GEOD.Inverse(lat0, lon0 - ddeg/2, lat0, lon0 + ddeg/2)['s12'] / ddeg
+    return np.column_stack([
+        (gps_array[:,1] - lon0) * m_per_deg_lon,
+        (gps_array[:,0] - lat0) * m_per_deg_lat,
+    ])
+
 def convert_local_m_to_delta_gps(gp0, dm):
 
     # first travel dm[1] meters north/south
     # then travel dm[0] meters east/west
 
-    geod = Geodesic.WGS84
-    gr = geod.Direct(*gp0, 0, dm[1])
-    gr2 = geod.Direct(gr['lat2'],gr['lon2'],90, dm[0])
+    gr = _GEOD.Direct(*gp0, 0, dm[1])
+    gr2 = _GEOD.Direct(gr['lat2'],gr['lon2'],90, dm[0])
     return np.array([gr2['lat2'], gr2['lon2']])
 
 def calculate_turn_angles_deg(path_coordinates):
-    norm_vectors = []
-
-    for i in range(len(path_coordinates) - 1):
-        tail_x, tail_y = path_coordinates[i][0], path_coordinates[i][1]
-        head_x, head_y = path_coordinates[i + 1][0], path_coordinates[i + 1][1]
-        
-        result_vector = np.array([head_x - tail_x, head_y - tail_y])
-        norm_vectors.append(result_vector / np.linalg.norm(result_vector))
-
-    turn_angles = []
-    for i in range(len(norm_vectors) - 1):
-        turn_angles.append(np.degrees(np.arccos(np.dot(norm_vectors[i], norm_vectors[i + 1]))))
-    
-    return turn_angles
+    pts = np.asarray(path_coordinates, dtype=np.float64)
+    deltas = np.diff(pts, axis=0)
+    norm_vectors = deltas / np.linalg.norm(deltas, axis=1, keepdims=True)
+    # clip so floating point drift just outside [-1, 1] can't NaN the arccos
+    dots = np.clip((norm_vectors[:-1] * norm_vectors[1:]).sum(axis=1), -1.0, 1.0)
+    return np.degrees(np.arccos(dots)).tolist()
 
 def pose_to_xy(pose):
     pos = pose.pose.position
@@ -1,5 +1,13 @@
-import line_profiler
-profiler = line_profiler.LineProfiler()
+import os
+
+if os.environ.get("UAVF_PROFILE"):
+    import line_profiler
+    profiler = line_profiler.LineProfiler()
+else:
+    # no-op stand-in so `@profiler` decorations cost nothing (and the
+    # line_profiler C extension isn't even imported) in normal runs
+    def profiler(func):
+        return func
 
 from .image_processor import ImageProcessor
 from .localizer import Localizer
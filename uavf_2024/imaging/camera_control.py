@@ -66,7 +66,11 @@ class MetadataBuffer:
     def append(self, datum):
         with self.lock:
             self._queue.append(datum)
-        
+
+    def get_latest(self):
+        with self.lock:
+            return self._queue[-1] if len(self._queue) > 0 else None
+
     def get_interpolated(self, timestamp: float):
         with self.lock:
             if self._queue[-1]['time_seconds'] < timestamp:
@@ -242,7 +246,19 @@ class Camera:
     def getAttitude(self):
         ''' Returns (yaw, pitch, roll) '''
         return self.cam.getAttitude()
-    
+
+    def getAttitudeCached(self):
+        '''
+        Returns the most recent (yaw, pitch, roll) sampled by the recording
+        worker, falling back to a direct SDK query if no sample exists yet.
+        Use this instead of getAttitude in hot paths to avoid redundant
+        round-trips to the gimbal.
+        '''
+        latest = self.metadata_buffer.get_latest()
+        if latest is not None:
+            return latest['attitude']
+        return self.getAttitude()
+
     def getAttitudeInterpolated(self, timestamp: float, offset: float=1):
         return self.metadata_buffer.get_interpolated(timestamp-offset)['attitude'] # offset for camera lag
     
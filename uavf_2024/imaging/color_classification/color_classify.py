@@ -51,6 +51,15 @@ class ColorClassifier:
         self.model = self.load_model(model_path, num_classes)
         self.transform = transforms.ToTensor()
 
+        if torch.cuda.is_available() and hasattr(torch, 'compile'):
+            # fuse the conv/dense kernels and capture CUDA graphs for this
+            # small model; warm up on a single image so the compile cost is
+            # paid at init instead of on the first real frame (other batch
+            # shapes compile on first use)
+            self.model = torch.compile(self.model, mode="reduce-overhead")
+            with torch.inference_mode():
+                self.model(torch.zeros(1, 3, 128, 128, device='cuda'))
+
     def load_model(self, model_path, num_classes):
         model = ColorModel(num_classes)
         try:
@@ -77,11 +86,30 @@ class ColorClassifier:
         if torch.cuda.is_available():
             image_tensor = image_tensor.to('cuda')
 
-        with torch.no_grad():
+        with torch.inference_mode():
             predicted_letter, predicted_shape = self.model.forward(image_tensor)
         letter_probs, shape_probs = predicted_letter.cpu()[0].numpy(), predicted_shape[0].cpu().numpy()
 
         # janky label swap b/c this increases the accuracy
-        shape_probs[0], shape_probs[2] = shape_probs[2], shape_probs[0]         
-        
+        shape_probs[0], shape_probs[2] = shape_probs[2], shape_probs[0]
+
         return letter_probs, shape_probs
+
+    def predict_batch(self, images: list[np.ndarray]) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Batched version of `predict`: one forward pass for the whole list"""
+        if len(images) == 0:
+            return []
+
+        batch = torch.stack([self.transform(image) for image in images])
+
+        if torch.cuda.is_available():
+            batch = batch.to('cuda')
+
+        with torch.inference_mode():
+            predicted_letter, predicted_shape = self.model.forward(batch)
+        letter_probs, shape_probs = predicted_letter.cpu().numpy(), predicted_shape.cpu().numpy()
+
+        # janky label swap b/c this increases the accuracy
+        shape_probs[:, [0, 2]] = shape_probs[:, [2, 0]]
+
+        return list(zip(letter_probs, shape_probs))
@@ -1,4 +1,5 @@
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import numpy as np
 import os
@@ -92,6 +93,17 @@ class ImageProcessor:
         self.shape_batch_size = shape_batch_size
         self.letter_batch_size = letter_batch_size
 
+        # Background writer for the debug visualizations so process_image
+        # doesn't block on PNG encoding and disk I/O. cv.imwrite releases
+        # the GIL while encoding, so these writes overlap with inference.
+        self._debug_writer = ThreadPoolExecutor(max_workers=1)
+
+        # reusable batch buffer for the resized letter crops, so the hot
+        # loop doesn't allocate a fresh 128x128 array per detection
+        self._letter_batch_buf = np.zeros(
+            (letter_batch_size, self.letter_size, self.letter_size, 3), dtype=np.float32
+        )
+
     def get_last_logs_path(self):
         return f"{self.debug_path}/img_{self.num_processed-1}"
     
@@ -101,13 +113,14 @@ class ImageProcessor:
         os.makedirs(self.debug_path, exist_ok=True)
 
     def _make_shape_detection(self, img : Image) -> list[DetectionResult]:
-        shape_results: list[DetectionResult] = []
-
         all_tiles = [img.as_tile()]#img.generate_tiles(self.tile_size, self.min_tile_overlap)
-        for tiles_batch in batched(all_tiles, self.shape_batch_size):
-            temp = self.shape_detector.predict(tiles_batch)
-            if temp is not None: shape_results.extend(temp)
-        
+        # single predict over every tile: ultralytics batches the whole
+        # list into one forward pass, instead of one launch (plus python
+        # dispatch) per shape_batch_size chunk
+        shape_results = self.shape_detector.predict(all_tiles)
+        if shape_results is None:
+            shape_results = []
+
         shape_results = nms_process(shape_results, self.thresh_iou)
 
         return shape_results
@@ -117,17 +130,22 @@ class ImageProcessor:
         # create debug directory for segmentation and classification
         for results in batched(shape_results, self.letter_batch_size):
             results: list[DetectionResult] = results # type hinting
-            letter_imgs = []
-            for shape_res in results: # These are all linear operations so not parallelized (yet)
-                # Color segmentations
-                shape_conf = shape_res.confidences
-                letter_img = cv.resize(shape_res.img.get_array().astype(np.float32), (128,128))
-                letter_imgs.append(letter_img)
+            for i, shape_res in enumerate(results):
+                cv.resize(
+                    shape_res.img.get_array().astype(np.float32),
+                    (self.letter_size, self.letter_size),
+                    dst=self._letter_batch_buf[i]
+                )
+            # the classifiers copy into their own tensors, so handing out
+            # views into the shared buffer is safe
+            letter_imgs = [self._letter_batch_buf[i] for i in range(len(results))]
 
-                # Classify the colors
-                letter_color_conf, shape_color_conf = self.color_classifier.predict(letter_img)
+            # Classify the colors for the whole batch in one forward pass
+            # instead of a model call per detection
+            color_confs = self.color_classifier.predict_batch(letter_imgs)
 
-                # add to total_results
+            for shape_res, (letter_color_conf, shape_color_conf) in zip(results, color_confs):
+                # letter probs are filled in after the batched letter predict
                 letter_conf = None
                 total_results.append(
                 FullBBoxPrediction(
@@ -136,7 +154,7 @@ class ImageProcessor:
                     shape_res.width,
                     shape_res.height,
                     ProbabilisticTargetDescriptor(
-                        shape_conf,
+                        shape_res.confidences,
                         letter_conf,
                         shape_color_conf,
                         letter_color_conf
@@ -169,33 +187,85 @@ class ImageProcessor:
         if self.debug_path is not None:
             local_debug_path = f"{self.debug_path}/img_{self.num_processed}"
             os.makedirs(local_debug_path, exist_ok=True)
-            for shape_res in shape_results:
-                path = f"{local_debug_path}/det_{shape_res.id}"
-                os.makedirs(path, exist_ok=True)
-                cv.imwrite(f"{path}/input.png", shape_res.img.get_array())
-
-            img_to_draw_on = img.get_array().copy()
-            for result in total_results:
-                x,y,w,h = result.x, result.y, result.width, result.height
-                cv.rectangle(img_to_draw_on, (x-w//2,y-h//2), (x+w//2,y+h//2), (0,255,0), 2)
-                shape_col, shape, letter_col, letter = str(result.descriptor.collapse_to_certain()).split(" ")
-                shape_col_prob = max(result.descriptor.shape_col_probs)
-                shape_prob = max(result.descriptor.shape_probs)
-                letter_col_prob = max(result.descriptor.letter_col_probs)
-                letter_prob = max(result.descriptor.letter_probs)
-                cv.putText(img_to_draw_on, f"{result.det_id}", (x,y), cv.FONT_HERSHEY_SIMPLEX, 1, (0,255,0), 2)
-                cv.putText(img_to_draw_on, f"{shape_col}: {shape_col_prob:.03f}", (x+w,y), cv.FONT_HERSHEY_SIMPLEX, 0.5, (0,255,0), 1)
-                cv.putText(img_to_draw_on, f"{shape}: {shape_prob:.03f}", (x+w,y+20), cv.FONT_HERSHEY_SIMPLEX, 0.5, (0,255,0), 1)
-                cv.putText(img_to_draw_on, f"{letter_col}: {letter_col_prob:.03f}", (x+w,y+40), cv.FONT_HERSHEY_SIMPLEX, 0.5, (0,255,0), 1)
-                cv.putText(img_to_draw_on, f"{letter}: {letter_prob:.03f}", (x+w,y+60), cv.FONT_HERSHEY_SIMPLEX, 0.5, (0,255,0), 1)
-                pred_descriptor_string = str(result.descriptor)
-                with open(f"{local_debug_path}/det_{result.det_id}/descriptor.txt", "w") as f:
-                    f.write(pred_descriptor_string)
-            cv.imwrite(f"{local_debug_path}/bounding_boxes.png", img_to_draw_on)
+            self._debug_writer.submit(
+                self._write_debug_images, shape_results, total_results, img, local_debug_path
+            )
 
         self.num_processed += 1
         return total_results
-    
+
+    def _write_debug_images(
+        self,
+        shape_results: list[DetectionResult],
+        total_results: list[FullBBoxPrediction],
+        img: Image,
+        local_debug_path: str
+    ):
+        for shape_res in shape_results:
+            path = f"{local_debug_path}/det_{shape_res.id}"
+            os.makedirs(path, exist_ok=True)
+            cv.imwrite(f"{path}/input.png", shape_res.img.get_array())
+
+        img_to_draw_on = img.get_array().copy()
+        for result in total_results:
+            x,y,w,h = result.x, result.y, result.width, result.height
+            cv.rectangle(img_to_draw_on, (x-w//2,y-h//2), (x+w//2,y+h//2), (0,255,0), 2)
+            shape_col, shape, letter_col, letter = str(result.descriptor.collapse_to_certain()).split(" ")
+            shape_col_prob = max(result.descriptor.shape_col_probs)
+            shape_prob = max(result.descriptor.shape_probs)
+            letter_col_prob = max(result.descriptor.letter_col_probs)
+            letter_prob = max(result.descriptor.letter_probs)
+            cv.putText(img_to_draw_on, f"{result.det_id}", (x,y), cv.FONT_HERSHEY_SIMPLEX, 1, (0,255,0), 2)
+            cv.putText(img_to_draw_on, f"{shape_col}: {shape_col_prob:.03f}", (x+w,y), cv.FONT_HERSHEY_SIMPLEX, 0.5, (0,255,0), 1)
+            cv.putText(img_to_draw_on, f"{shape}: {shape_prob:.03f}", (x+w,y+20), cv.FONT_HERSHEY_SIMPLEX, 0.5, (0,255,0), 1)
+            cv.putText(img_to_draw_on, f"{letter_col}: {letter_col_prob:.03f}", (x+w,y+40), cv.FONT_HERSHEY_SIMPLEX, 0.5, (0,255,0), 1)
+            cv.putText(img_to_draw_on, f"{letter}: {letter_prob:.03f}", (x+w,y+60), cv.FONT_HERSHEY_SIMPLEX, 0.5, (0,255,0), 1)
+            pred_descriptor_string = str(result.descriptor)
+            with open(f"{local_debug_path}/det_{result.det_id}/descriptor.txt", "w") as f:
+                f.write(pred_descriptor_string)
+        cv.imwrite(f"{local_debug_path}/bounding_boxes.png", img_to_draw_on)
+
+    def process_images(self, imgs: list[Image]) -> list[list[FullBBoxPrediction]]:
+        '''
+        Processes a batch of images, filling classifier batches across
+        image boundaries instead of flushing a partial batch per image.
+
+        Returns one list of predictions per input image, in order.
+        '''
+        all_shape_results: list[DetectionResult] = []
+        counts: list[int] = []
+        for img in imgs:
+            if not isinstance(img, Image):
+                raise TypeError("img must be an Image object")
+            if not img.dim_order == HWC:
+                raise ValueError("img must be in HWC order")
+            shape_results = self._make_shape_detection(img)
+            counts.append(len(shape_results))
+            all_shape_results.extend(shape_results)
+
+        total_results = self._classify_color_and_char(all_shape_results)
+
+        results_per_img: list[list[FullBBoxPrediction]] = []
+        offset = 0
+        for img, count in zip(imgs, counts):
+            img_results = total_results[offset:offset+count]
+            for result in img_results:
+                result.img_id = self.num_processed
+
+            if self.debug_path is not None:
+                local_debug_path = f"{self.debug_path}/img_{self.num_processed}"
+                os.makedirs(local_debug_path, exist_ok=True)
+                self._debug_writer.submit(
+                    self._write_debug_images,
+                    all_shape_results[offset:offset+count], img_results, img, local_debug_path
+                )
+
+            self.num_processed += 1
+            offset += count
+            results_per_img.append(img_results)
+
+        return results_per_img
+
     def process_image_lightweight(self, img : Image) -> list[FullBBoxPrediction]:
         '''
         Processes image and runs shape detection
@@ -1,5 +1,6 @@
 from __future__ import annotations
 from dataclasses import dataclass
+import mmap
 import os
 from typing import Generator, Generic, NamedTuple, TypeVar, Union
 import cv2
@@ -41,6 +42,15 @@ LETTERS = "01ABCDEFGHIJ2KLMNOPQRST3UVWXYZ456789"
 
 COLORS = list(COLOR_INDICES.keys())
 
+# O(1) index lookups for descriptor conversions instead of list.index /
+# str.index scans per call (COLOR_INDICES above already covers colors)
+_SHAPE_INDICES = {shape: i for i, shape in enumerate(SHAPES)}
+_LETTER_INDICES = {letter: i for i, letter in enumerate(LETTERS)}
+
+# cached uniform-distribution templates; .copy() at use sites
+_UNIFORM_LETTER_PROBS = np.ones(len(LETTERS)) / len(LETTERS)
+_UNIFORM_COLOR_PROBS = np.ones(len(COLORS)) / len(COLORS)
+
 # TODO: Limit these to the types we actually use
 integer = Union[int, np.uint8, np.uint16, np.uint32, np.uint64, np.int8, np.int16, np.int32, np.int64]
 real = Union[float, np.float16, np.float32, np.float64]
@@ -76,15 +86,22 @@ class ProbabilisticTargetDescriptor:
         '''
         Converts a string representation of a ProbabilisticTargetDescriptor back into a ProbabilisticTargetDescriptor object.
         '''
-        shape_lines = string.split("Shapes:\n")[1].split("Letters:")[0].split("\n")[:-1]
-        shape_probs = np.array([float(line.split(": ")[1].strip()) for line in shape_lines])
-        letter_lines = string.split("Letters:\n")[1].split("Shape Colors:")[0].split("\n")[:-1]
-        letter_probs = np.array([float(line.split(": ")[1].strip()) for line in letter_lines])
-        shape_col_lines = string.split("Shape Colors:\n")[1].split("Letter Colors:")[0].split("\n")[:-1]
-        shape_col_probs = np.array([float(line.split(": ")[1].strip()) for line in shape_col_lines])
-        letter_col_lines = string.split("Letter Colors:\n")[1].split("\n")[:-2]
-        letter_col_probs = np.array([float(line.split(": ")[1].strip()) for line in letter_col_lines])
-        return ProbabilisticTargetDescriptor(shape_probs, letter_probs, shape_col_probs, letter_col_probs)
+        # single pass over the lines instead of re-splitting the whole
+        # string once per section
+        sections = {"Shapes:": [], "Letters:": [], "Shape Colors:": [], "Letter Colors:": []}
+        current = None
+        for line in string.split("\n"):
+            stripped = line.strip()
+            if stripped in sections:
+                current = sections[stripped]
+            elif current is not None and ": " in stripped:
+                current.append(float(stripped.rsplit(": ", 1)[1]))
+        return ProbabilisticTargetDescriptor(
+            np.array(sections["Shapes:"]),
+            np.array(sections["Letters:"]),
+            np.array(sections["Shape Colors:"]),
+            np.array(sections["Letter Colors:"])
+        )
 
     def __add__(self, other):
         return ProbabilisticTargetDescriptor(
@@ -110,6 +127,23 @@ class ProbabilisticTargetDescriptor:
             LETTERS[np.argmax(self.letter_probs)]
         )
 
+    @staticmethod
+    def batch_collapse(descriptors: 'list[ProbabilisticTargetDescriptor]') -> 'list[CertainTargetDescriptor]':
+        '''
+        Collapses a whole list of descriptors with one stacked argmax per
+        field instead of four argmax calls per descriptor.
+        '''
+        if len(descriptors) == 0:
+            return []
+        shape_col_idxs = np.argmax([d.shape_col_probs for d in descriptors], axis=1)
+        shape_idxs = np.argmax([d.shape_probs for d in descriptors], axis=1)
+        letter_col_idxs = np.argmax([d.letter_col_probs for d in descriptors], axis=1)
+        letter_idxs = np.argmax([d.letter_probs for d in descriptors], axis=1)
+        return [
+            CertainTargetDescriptor(COLORS[sc], SHAPES[s], COLORS[lc], LETTERS[l])
+            for sc, s, lc, l in zip(shape_col_idxs, shape_idxs, letter_col_idxs, letter_idxs)
+        ]
+
 
 class CertainTargetDescriptor:
     '''
@@ -154,10 +188,10 @@ class CertainTargetDescriptor:
         If a value is None, it will be returned as None in the tuple instead of an integer.
         '''
         return (
-            COLORS.index(self.shape_col) if self.shape_col is not None else None,
-            SHAPES.index(self.shape) if self.shape is not None else None,
-            COLORS.index(self.letter_col) if self.letter_col is not None else None,
-            LETTERS.index(self.letter) if self.letter is not None else None
+            COLOR_INDICES[self.shape_col] if self.shape_col is not None else None,
+            _SHAPE_INDICES[self.shape] if self.shape is not None else None,
+            COLOR_INDICES[self.letter_col] if self.letter_col is not None else None,
+            _LETTER_INDICES[self.letter] if self.letter is not None else None
         )
     
     def as_probabilistic(self, force_through_none = True) -> ProbabilisticTargetDescriptor:
@@ -172,25 +206,25 @@ class CertainTargetDescriptor:
             raise ValueError(err_message+ f" {self}")
 
         shape_probs = np.zeros(len(SHAPES))
-        shape_probs[SHAPES.index(self.shape)] = 1.0
+        shape_probs[_SHAPE_INDICES[self.shape]] = 1.0
 
         if self.letter is None:
-            letter_probs = np.ones(len(LETTERS)) / len(LETTERS)
+            letter_probs = _UNIFORM_LETTER_PROBS.copy()
         else:
             letter_probs = np.zeros(len(LETTERS))
-            letter_probs[LETTERS.index(self.letter)] = 1.0
+            letter_probs[_LETTER_INDICES[self.letter]] = 1.0
 
         if self.shape_col is None:
-            shape_col_probs = np.ones(len(COLORS)) / len(COLORS)
+            shape_col_probs = _UNIFORM_COLOR_PROBS.copy()
         else:
             shape_col_probs = np.zeros(len(COLORS))
-            shape_col_probs[COLORS.index(self.shape_col)] = 1.0
-        
+            shape_col_probs[COLOR_INDICES[self.shape_col]] = 1.0
+
         if self.letter_col is None:
-            letter_col_probs = np.ones(len(COLORS)) / len(COLORS)
+            letter_col_probs = _UNIFORM_COLOR_PROBS.copy()
         else:
             letter_col_probs = np.zeros(len(COLORS))
-            letter_col_probs[COLORS.index(self.letter_col)] = 1.0
+            letter_col_probs[COLOR_INDICES[self.letter_col]] = 1.0
 
         return ProbabilisticTargetDescriptor(shape_probs, letter_probs, shape_col_probs, letter_col_probs)
 
@@ -211,11 +245,21 @@ class BoundingBox:
     width: img_coord_t
     height: img_coord_t
 
+    def __post_init__(self):
+        # lazy conversion caches; boxes are treated as immutable once
+        # either conversion has been requested
+        self._arr = None
+        self._xyxy = None
+
     def to_ndarray(self):
-        return np.array([self.x, self.y, self.width, self.height])
+        if self._arr is None:
+            self._arr = np.array([self.x, self.y, self.width, self.height])
+        return self._arr
 
     def to_xyxy(self):
-        return np.array([self.x-self.width//2, self.y-self.height//2, self.x+self.width//2, self.y+self.height//2])
+        if self._xyxy is None:
+            self._xyxy = np.array([self.x-self.width//2, self.y-self.height//2, self.x+self.width//2, self.y+self.height//2])
+        return self._xyxy
 
     @staticmethod
     def from_ndarray(arr: np.ndarray):
@@ -249,7 +293,9 @@ class FullBBoxGroundTruth:
     img_id: int = None
     det_id: int = None
 
-@dataclass
+# slots=True: these are constructed per detection per frame, and slot
+# storage is both faster to fill and smaller than a per-instance dict
+@dataclass(slots=True)
 class DetectionResult:
     '''
     `mask` and `img` should be (w,h,c) where c is 1 for mask and 3 for img
@@ -286,7 +332,8 @@ class Target3D:
         )
     def __repr__(self):
         certain = self.descriptor.collapse_to_certain()
-        descriptor_str = f'{certain.shape_col} ({max(self.descriptor.shape_col_probs)}) {certain.shape} ({max(self.descriptor.shape_probs)}) {certain.letter_col} ({max(self.descriptor.letter_col_probs)}) {certain.letter} ({max(self.descriptor.letter_probs)})'
+        # .max() reduces in C; builtin max() iterates the array in Python
+        descriptor_str = f'{certain.shape_col} ({self.descriptor.shape_col_probs.max()}) {certain.shape} ({self.descriptor.shape_probs.max()}) {certain.letter_col} ({self.descriptor.letter_col_probs.max()}) {certain.letter} ({self.descriptor.letter_probs.max()})'
         position_str = f'({self.position[0]:.02f}, {self.position[1]:.02f}, {self.position[2]:.02f})'
 
         return f'{descriptor_str} at {position_str} with id {self.id}'
@@ -346,27 +393,34 @@ class Image(Generic[_UnderlyingImageT]):
         image_chw[torch.Tensor] = Image(torch.zeros((3, 20, 20)), CHW)
     """    
     def __init__(
-        self, 
-        array: _UnderlyingImageT, 
-        dim_order: ImageDimensionsOrder = HWC
+        self,
+        array: _UnderlyingImageT,
+        dim_order: ImageDimensionsOrder = HWC,
+        _unchecked: bool = False
     ):
-        if not isinstance(array, np.ndarray) and not isinstance(array, torch.Tensor):
-            raise TypeError(f"array must be a numpy array or torch tensor. Got {type(array)}")
-        
-        if len(array.shape) != 3:
-            raise ValueError("array must have 3 axes, got shape " + str(array.shape))
-        
-        if dim_order not in _VALID_DIM_ORDERS:
-            raise ValueError("dim_order must be one of " + str(_VALID_DIM_ORDERS))
+        # _unchecked skips validation for internal callers like
+        # make_sub_image that slice an already-validated array. Tiling
+        # makes dozens of these per image, so the four checks add up.
+        if not _unchecked:
+            if not isinstance(array, np.ndarray) and not isinstance(array, torch.Tensor):
+                raise TypeError(f"array must be a numpy array or torch tensor. Got {type(array)}")
+
+            if len(array.shape) != 3:
+                raise ValueError("array must have 3 axes, got shape " + str(array.shape))
+
+            if dim_order not in _VALID_DIM_ORDERS:
+                raise ValueError("dim_order must be one of " + str(_VALID_DIM_ORDERS))
+
+            channels_index = dim_order.index(CHANNELS)
+            if array.shape[channels_index] != 3:
+                raise ValueError("Image array must have 3 channels, got " + str(array[channels_index]))
 
         self._dim_order = dim_order
-        
-        channels_index = self._dim_order.index(CHANNELS)
-        if array.shape[channels_index] != 3:
-            raise ValueError("Image array must have 3 channels, got " + str(array[channels_index]))
-        
         self._array: _UnderlyingImageT = array
-        
+        # pick the slicing specialization once instead of recomputing
+        # dim-order index lookups on every make_sub_image call
+        self._slice_sub_array = self._slice_hwc if dim_order == HWC else self._slice_chw
+
     def __getitem__(self, key):
         return self._array[key]
     
@@ -381,7 +435,13 @@ class Image(Generic[_UnderlyingImageT]):
         """
         Checks whether two images are equal, including whether they have the same dimension order.
         """
-        return isinstance(other, Image) and self._dim_order == other._dim_order and (self._array == other._array).all()
+        if not isinstance(other, Image) or self._dim_order != other._dim_order:
+            return False
+        # array_equal/torch.equal short-circuit on shape mismatch and skip
+        # the full-size bool intermediate that (a == b).all() allocates
+        if isinstance(self._array, torch.Tensor) and isinstance(other._array, torch.Tensor):
+            return torch.equal(self._array, other._array)
+        return np.array_equal(self._array, other._array)
     
     def __repr__(self):
         return f"Image({self._array}, {self._dim_order})"
@@ -395,15 +455,17 @@ class Image(Generic[_UnderlyingImageT]):
     def get_array(self) -> _UnderlyingImageT:
         return self._array
     
+    def _slice_hwc(self, x_coord, y_coord, width, height) -> _UnderlyingImageT:
+        return self._array[y_coord:y_coord+height, x_coord:x_coord+width]
+
+    def _slice_chw(self, x_coord, y_coord, width, height) -> _UnderlyingImageT:
+        return self._array[:, y_coord:y_coord+height, x_coord:x_coord+width]
+
     def make_sub_image(self, x_coord, y_coord, width, height) -> 'Image':
         """
         Does not copy the underlying array.
         """
-        indicies = [slice(None)] * 3
-        indicies[self._dim_order.index(HEIGHT)] = slice(y_coord, y_coord+height)
-        indicies[self._dim_order.index(WIDTH)] = slice(x_coord, x_coord+width)
-        
-        return Image(self._array[tuple(indicies)], self._dim_order) 
+        return Image(self._slice_sub_array(x_coord, y_coord, width, height), self._dim_order, _unchecked=True)
     
     def make_tile(self, x_coord, y_coord, tile_size) -> Tile:
         """
@@ -455,24 +517,45 @@ class Image(Generic[_UnderlyingImageT]):
         """
         if array_type == np.ndarray:
             array = cv2.imread(fp).astype(dtype)
-            img = Image(array, HWC)
-            if dim_order != HWC:
-                img.change_dim_order(dim_order)
-            
-            return img
-        
+            if dim_order == CHW:
+                # store contiguous CHW up front; a transpose view here would
+                # force a hidden contiguous copy at every torch ingestion
+                array = np.ascontiguousarray(array.transpose(2, 0, 1))
+            return Image(array, dim_order)
+
         elif array_type == torch.Tensor:
             # Inherits np.ndarray's dtype
             array = torch.from_numpy(cv2.imread(fp).astype(dtype))
-            img = Image(array, HWC)
-            if dim_order != HWC:
-                img.change_dim_order(dim_order)
-            
-            return img
+            if dim_order == CHW:
+                array = array.permute(2, 0, 1).contiguous()
+            if torch.cuda.is_available():
+                # pinned host memory lets later .to('cuda', non_blocking=True)
+                # copies run async instead of blocking on a pageable transfer
+                array = array.pin_memory()
+            return Image(array, dim_order)
         
         else:
             raise TypeError("array_type must be np.ndarray or torch.Tensor")
-    
+
+    @staticmethod
+    def from_mmap(fp: str, dim_order: ImageDimensionsOrder = HWC) -> 'Image[np.ndarray]':
+        """
+        Reads an image by memory-mapping the file and decoding the mapped
+        bytes with cv2.imdecode. Skips the intermediate bytes copy a
+        regular read would make and lets repeat reads of the same file be
+        served straight from the OS page cache. Like `from_file`, the
+        image will be in BGR format.
+        """
+        with open(fp, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                array = cv2.imdecode(np.frombuffer(mm, np.uint8), cv2.IMREAD_COLOR)
+
+        img = Image(array, HWC)
+        if dim_order != HWC:
+            img.change_dim_order(dim_order)
+
+        return img
+
     def save(self, fp: os.PathLike | str) -> None:
         """
         Saves the image to a file. Uses cv2.imwrite internally.
@@ -494,6 +577,9 @@ class Image(Generic[_UnderlyingImageT]):
         Use transpose to change the order of the dimensions in-place. This does NOT copy the underlying array.
         Changes the dim_order accordingly.
         """
+        if target_dim_order == self._dim_order:
+            return
+
         transposition_indices = (
             self._dim_order.index(target_dim_order.first_dim),
             self._dim_order.index(target_dim_order.second_dim),
@@ -508,7 +594,8 @@ class Image(Generic[_UnderlyingImageT]):
             TypeError("Inner array must be a numpy array or torch tensor")
         
         self._dim_order = target_dim_order
-        
+        self._slice_sub_array = self._slice_hwc if target_dim_order == HWC else self._slice_chw
+
     def generate_tiles(self, tile_size: int, min_overlap: int = 0) -> Generator[Tile, None, None]:
         """
         Split high resolution input image into number of fixed-dimension, squares tiles, 
@@ -529,41 +616,33 @@ class Image(Generic[_UnderlyingImageT]):
         if tile_size > img_width or tile_size > img_height:
             raise ValueError("tile dimensions cannot be larger than origin dimensions")
 
-        # Number of tiles in each dimension
-        x_count = np.uint8(np.ceil(
-            (img_width - min_overlap) / (tile_size - min_overlap)
-        ))
-        y_count = np.uint8(np.ceil(
-            (img_height - min_overlap) / (tile_size - min_overlap)
-        ))
+        # Number of tiles in each dimension. Integer ceiling division:
+        # cheaper than round-tripping scalars through np.ceil, and exact
+        x_count = -((img_width - min_overlap) // -(tile_size - min_overlap))
+        y_count = -((img_height - min_overlap) // -(tile_size - min_overlap))
 
         # Total remainders
         overflow_x = tile_size + (x_count - 1) * (tile_size - min_overlap) - img_width
         overflow_y = tile_size + (y_count - 1) * (tile_size - min_overlap) - img_height
 
-        # Temporarily suppress divide-by-zero warnings
-        np.seterr(divide='ignore', invalid='ignore')
-
-        # Set up remainders per tile
-        remaindersX = np.ones((x_count-1,), dtype=np.uint8) * img_coord_t(np.floor(overflow_x / (x_count-1)))
-        remaindersY = np.ones((y_count-1,), dtype=np.uint8) * img_coord_t(np.floor(overflow_y / (y_count-1)))
-        remaindersX[0:np.remainder(overflow_x, img_coord_t(x_count-1))] += 1
-        remaindersY[0:np.remainder(overflow_y, img_coord_t(y_count-1))] += 1
-
-        np.seterr(divide='warn', invalid='warn')
-            
-        y = img_coord_t(0)
-        for vertical_index in range(y_count):
-            x = img_coord_t(0)
-            for horizontal_index in range(x_count):
-                # Converting back to int because its expected downstream
-                # All dimensions should be refactored to use unit16
+        xs = self._tile_origins(x_count, tile_size, min_overlap, overflow_x)
+        ys = self._tile_origins(y_count, tile_size, min_overlap, overflow_y)
+
+        for y in ys:
+            for x in xs:
                 yield self.make_tile(x, y, tile_size)
-                
-                if horizontal_index < (x_count-1):
-                    next_horizontal_overlap = min_overlap + remaindersX[horizontal_index]
-                    x += tile_size - next_horizontal_overlap
-                    
-            if vertical_index < (y_count-1):
-                next_vertical_overlap = min_overlap + remaindersY[vertical_index]
-                y += tile_size - next_vertical_overlap
+
+    @staticmethod
+    def _tile_origins(count: int, tile_size: int, min_overlap: int, overflow: int) -> list[int]:
+        """
+        Computes the tile origin offsets along one axis, spreading the
+        overflow pixels across the inter-tile overlaps. One cumsum over
+        int32 steps instead of per-tile accumulation in uint8 scalars,
+        which silently wrapped around past offset 255.
+        """
+        if count <= 1:
+            return [0]
+        remainders = np.full(count - 1, overflow // (count - 1), dtype=np.int32)
+        remainders[:overflow % (count - 1)] += 1
+        steps = tile_size - min_overlap - remainders
+        return [0] + np.cumsum(steps).tolist()
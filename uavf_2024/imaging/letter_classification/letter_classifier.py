@@ -1,19 +1,20 @@
 from __future__ import annotations
-from ultralytics import YOLO
 import numpy as np
 from ultralytics.engine.results import Results
 import torch
 import os
 
+from ..utils import load_yolo, resolve_weights
+
 CURRENT_FILE_PATH = os.path.dirname(os.path.realpath(__file__))
 
 class LetterClassifier:
     def __init__(self, img_size):
-        self.model = YOLO(f'{CURRENT_FILE_PATH}/weights/letter.pt')
+        self.model = load_yolo(resolve_weights(f'{CURRENT_FILE_PATH}/weights/letter'))
 
-        rand_input = np.random.rand(1, img_size, img_size, 3).astype(np.float32)
+        warmup_input = np.zeros((1, img_size, img_size, 3), dtype=np.float32)
         device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        self.model.predict(list(rand_input), verbose=False, device=device)
+        self.model.predict(list(warmup_input), verbose=False, device=device)
     
     def predict(self, imgs : list[np.ndarray]) -> list[np.ndarray]:
         '''
@@ -24,8 +25,7 @@ class LetterClassifier:
         '''
         # if imgs are black and white, change img.shape from (128,128) to (128,128,3)
         if len(imgs[0].shape) == 2:
-            print(imgs[0].shape)
             imgs = [np.repeat(img[...,np.newaxis],3,axis=2) for img in imgs]
-        raw_output: list[Results] = self.model.predict(imgs)
+        raw_output: list[Results] = self.model.predict(imgs, verbose=False, half=torch.cuda.is_available())
         output = [data.probs.data.cpu().numpy() for data in raw_output]
         return output
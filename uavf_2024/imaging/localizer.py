@@ -66,7 +66,40 @@ class Localizer:
         target_position = camera_position + t*rotated_vector
 
         return Target3D(target_position, pred.descriptor, id=f"img_{pred.img_id}/det_{pred.det_id}")
-        
+
+    def predictions_to_coords(self, preds: list[FullBBoxPrediction], camera_pose: tuple[np.ndarray, Rotation]) -> list[Target3D]:
+        '''
+        Batched version of `prediction_to_coords`. Does the ray math for
+        all predictions with a single Rotation.apply call and broadcasted
+        numpy ops instead of one pass per bounding box.
+        '''
+        if len(preds) == 0:
+            return []
+
+        w,h = self.camera_resolution
+        focal_len = w/(2*np.tan(np.deg2rad(self.camera_hfov/2)))
+
+        camera_position, rot_transform = camera_pose
+
+        positive_y_direction = np.cross(self.cam_initial_directions[0], self.cam_initial_directions[1])
+
+        xy = np.array([[pred.x, pred.y] for pred in preds], dtype=np.float64)
+        initial_direction_vectors = (
+            focal_len * self.cam_initial_directions[0]
+            + np.outer(xy[:,0] - w/2, self.cam_initial_directions[1])
+            + np.outer(xy[:,1] - h/2, positive_y_direction)
+        )
+
+        rotated_vectors = rot_transform.apply(initial_direction_vectors)
+
+        t = (self.ground_coordinate-camera_position[self.ground_axis])/rotated_vectors[:,self.ground_axis]
+        target_positions = camera_position + t[:,np.newaxis]*rotated_vectors
+
+        return [
+            Target3D(position, pred.descriptor, id=f"img_{pred.img_id}/det_{pred.det_id}")
+            for position, pred in zip(target_positions, preds)
+        ]
+
     def coords_to_2d(self, coords: tuple[float,float,float], camera_pose: tuple[np.ndarray, Rotation]) -> tuple[int, int]:
         cam_position, rot_transform = camera_pose
 
@@ -87,4 +120,26 @@ class Localizer:
 
         x = w/2 + x_component*scale_factor
         y = h/2 + y_component*scale_factor
-        return (int(x),int(y))
\ No newline at end of file
+        return (int(x),int(y))
+
+    def coords_to_2d_batch(self, coords: np.ndarray, camera_pose: tuple[np.ndarray, Rotation]) -> np.ndarray:
+        '''
+        Batched version of `coords_to_2d`. Projects an (N,3) array of world
+        coordinates with one inverse-rotation apply and broadcasted dot
+        products instead of a Python pass per point. Returns an (N,2) int
+        array of pixel coordinates.
+        '''
+        cam_position, rot_transform = camera_pose
+
+        relative_coords = np.atleast_2d(coords) - cam_position
+        rotated_vectors = rot_transform.inv().apply(relative_coords)
+
+        cam_y_direction = np.cross(self.cam_initial_directions[0], self.cam_initial_directions[1])
+
+        w,h = self.camera_resolution
+        focal_len = w/(2*np.tan(np.deg2rad(self.camera_hfov/2)))
+
+        scale_factors = focal_len/(rotated_vectors @ self.cam_initial_directions[0])
+        x = w/2 + (rotated_vectors @ self.cam_initial_directions[1])*scale_factors
+        y = h/2 + (rotated_vectors @ cam_y_direction)*scale_factors
+        return np.stack([x, y], axis=1).astype(int)
\ No newline at end of file
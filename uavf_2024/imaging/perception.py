@@ -17,7 +17,8 @@ import cv2
 from . import ImageProcessor, Camera, Localizer, PoseProvider, PoseDatum, Target3D, Image
 
 
-LOGS_PATH = Path(f'logs/{time.strftime("%m-%d %Hh%Mm")}')
+LOG_DIR_TIME_FORMAT = "%m-%d %Hh%Mm"
+LOGS_PATH = Path(f'logs/{time.strftime(LOG_DIR_TIME_FORMAT)}')
 def log_exceptions(func):
     '''
     Decorator that can be applied to methods on any class that extends
@@ -28,7 +29,9 @@ def log_exceptions(func):
         try:
             return func(self, *args, **kwargs)
         except Exception:
-            self.log(traceback.format_exc())
+            # logger.exception formats the traceback lazily inside the
+            # logging machinery instead of building the string up front
+            self.logger.exception(f"Exception in {func.__name__}")
     return wrapped_fn
 
 class Perception:
@@ -72,12 +75,25 @@ class Perception:
         self.recording = False
         
         self.image_processor = ImageProcessor(self.logs_path / 'image_processor')
+
+        # Cached Localizer; rebuilt only when the zoom level changes since
+        # the focal length (and first pose) are fixed for a given zoom.
+        self._localizer: Localizer | None = None
         
         # There can only be one process because it uses the GPU
         self.processor_pool = ThreadPoolExecutor(1)
         
         self.logging_pool = ThreadPoolExecutor(2)
         
+        # Ground-level z, cached from the first pose datum by cam_auto_point
+        self._ground_z: float | None = None
+
+        # Scratch array reused by get_image_down for the drone position.
+        # Safe because get_image_down only runs on the single-thread
+        # processor pool; anything handed to the logging pool must be
+        # snapshotted (e.g. via tolist) first.
+        self._cur_position_np = np.empty(3, dtype=np.float64)
+
         # This has to be injected because it needs to subscribe to the mavros topic
         self.pose_provider = pose_provider
         self.pose_provider.subscribe(self.cam_auto_point)
@@ -85,28 +101,36 @@ class Perception:
     def log(self, *args, **kwargs):
         self.logger.info(*args, **kwargs)
 
+    # Hysteresis band for auto-pointing (meters above ground). Pointing
+    # forward below the band and down above it stops the gimbal from
+    # thrashing when the drone hovers right at the threshold.
+    AUTO_POINT_DOWN_ALT = 3.5
+    AUTO_POINT_FORWARD_ALT = 2.5
+
     def cam_auto_point(self, current_pose: PoseDatum):
         current_z = current_pose.position.z
 
-        first_pose = self.pose_provider.get_first_datum()
-        if first_pose is None:
-            self.log("First datum not found trying to auto-point camera.")
-            return
-        
-        alt_from_gnd = current_z - first_pose.position.z
-        
+        if self._ground_z is None:
+            first_pose = self.pose_provider.get_first_datum()
+            if first_pose is None:
+                self.log("First datum not found trying to auto-point camera.")
+                return
+            self._ground_z = first_pose.position.z
+
+        alt_from_gnd = current_z - self._ground_z
+
         # If pointed down and close to the ground, point forward
-        if(self.camera_state and alt_from_gnd < 3): #3 meters ~ 30 feet
+        if(self.camera_state and alt_from_gnd < self.AUTO_POINT_FORWARD_ALT):
             self.camera.request_center()
             self.camera_state = False
             # self.camera.stop_recording()
-            self.log(f"Crossing 3m down, pointing forward. Current altitude: {alt_from_gnd}")
+            self.log(f"Crossing {self.AUTO_POINT_FORWARD_ALT}m down, pointing forward. Current altitude: {alt_from_gnd}")
         # If pointed forward and altitude is higher, point down
-        elif(not self.camera_state and alt_from_gnd > 3):
+        elif(not self.camera_state and alt_from_gnd > self.AUTO_POINT_DOWN_ALT):
             self.camera.request_down()
             self.camera_state = True
             # self.camera.start_recording()
-            self.log(f"Crossing 3m up, pointing down. Current altitude: {alt_from_gnd}")
+            self.log(f"Crossing {self.AUTO_POINT_DOWN_ALT}m up, pointing down. Current altitude: {alt_from_gnd}")
         else:
             return
         self.camera.request_autofocus()
@@ -132,12 +156,13 @@ class Perception:
         
         success: bool = self.camera.setAbsoluteZoom(zoom_level)
         self.camera.request_autofocus()
-        
+
         self.zoom_level = zoom_level
+        self._localizer = None # focal length changed; rebuild lazily
         return success
 
     def reset_log_dir(self):
-        new_logs_dir = Path('logs/{strftime("%m-%d %H:%M")}')
+        new_logs_dir = Path(f'logs/{time.strftime(LOG_DIR_TIME_FORMAT)}')
         self.log(f"Starting new log directory at {new_logs_dir}")
         os.makedirs(new_logs_dir, exist_ok = True)
         
@@ -146,20 +171,24 @@ class Perception:
         self.pose_provider.set_log_dir(new_logs_dir / 'pose')
 
     def make_localizer(self):
+        if self._localizer is not None:
+            return self._localizer
+
         focal_len = self.camera.getFocalLength()
-        
+
         first_pose = self.pose_provider.get_first_datum()
         if first_pose is None:
             self.log("First datum does not exist trying to make Localizer.")
             return
-        
+
         localizer = Localizer.from_focal_length(
-            focal_len, 
+            focal_len,
             (1920, 1080),
             (np.array([1,0,0]), np.array([0,-1, 0])),
             2,
             first_pose.position.z - 0.15 # cube is about 15cm off ground
         )
+        self._localizer = localizer
         return localizer
 
     def get_image_down_async(self) -> Future[list[Target3D]]:
@@ -183,8 +212,8 @@ class Perception:
         img: Image[np.ndarray], 
         timestamp: float,
         pose: PoseDatum,
-        angles: Sequence[float], 
-        cur_position_np: np.ndarray,
+        angles: Sequence[float],
+        cur_position: list[float],
         cur_rot_quat: np.ndarray
     ):
         logs_folder = self.image_processor.get_last_logs_path()
@@ -196,7 +225,7 @@ class Perception:
         log_data = {
             'pose_time': pose.time_seconds,
             'image_time': timestamp,
-            'drone_position': cur_position_np.tolist(),
+            'drone_position': cur_position,
             'drone_q': cur_rot_quat.tolist(),
             'gimbal_yaw': angles[0],
             'gimbal_pitch': angles[1],
@@ -235,7 +264,7 @@ class Perception:
         self.pose_provider.wait_for_data()
         self.log(f"Got past pose provider wait")
 
-        if abs(self.camera.getAttitude()[1] - -90) > 5: # Allow 5 degrees of error (Arbitrary)
+        if abs(self.camera.getAttitudeCached()[1] - -90) > 5: # Allow 5 degrees of error (Arbitrary)
             self.camera.request_down()
         self.log(f"Got past point down")
 
@@ -260,19 +289,23 @@ class Perception:
             self.log("Couldn't interpolate pose.")
         self.log(f"Got pose: {angles}")
 
-        cur_position_np = np.array([pose.position.x, pose.position.y, pose.position.z])
-        cur_rot_quat = pose.rotation.as_quat() # type: ignore
+        cur_position_np = self._cur_position_np
+        cur_position_np[0] = pose.position.x
+        cur_position_np[1] = pose.position.y
+        cur_position_np[2] = pose.position.z
+        cur_rot_quat = pose.quaternion
 
         world_orientation = self.camera.orientation_in_world_frame(pose.rotation, angles)
         cam_pose = (cur_position_np, world_orientation)
 
         # Get 3D predictions
-        preds_3d = [localizer.prediction_to_coords(d, cam_pose) for d in detections]
+        preds_3d = localizer.predictions_to_coords(detections, cam_pose)
 
-        # Log data asynchronously
+        # Log data asynchronously. The position scratch array is reused
+        # across calls, so snapshot it to a list before handing it off.
         self.logging_pool.submit(
-            self._log_image_down, 
-            preds_3d, img, timestamp, pose, angles, cur_position_np, cur_rot_quat
+            self._log_image_down,
+            preds_3d, img, timestamp, pose, angles, cur_position_np.tolist(), cur_rot_quat
         )
 
         return preds_3d
@@ -1,9 +1,10 @@
-from bisect import bisect_left
 import json
 import time
 from typing import Any, Callable, NamedTuple
 
-from rclpy.qos import DurabilityPolicy, QoSProfile, ReliabilityPolicy
+import numpy as np
+from rclpy.callback_groups import MutuallyExclusiveCallbackGroup
+from rclpy.qos import qos_profile_sensor_data
 from geometry_msgs.msg import Point, PoseStamped
 from scipy.spatial.transform import Rotation, Slerp
 
@@ -13,34 +14,203 @@ from uavf_2024.async_utils import RosLoggingProvider
 class PoseDatum(NamedTuple):
     """
     Our representation of the pose data from the Cube.
+
+    Stores the raw (x, y, z, w) quaternion; the scipy `Rotation` is only
+    built on demand via the `rotation` property, so the 100+ Hz pose
+    callback never pays for its construction.
     """
     position: Point
-    rotation: Rotation
+    quaternion: np.ndarray
     time_seconds: float
-    
+
+    @property
+    def rotation(self) -> Rotation:
+        return Rotation.from_quat(self.quaternion)
+
     def to_json(self):
         return {
             "position": [self.position.x, self.position.y, self.position.z],
-            "rotation": list(self.rotation.as_quat()),
+            "rotation": list(self.quaternion),
             "time_seconds": self.time_seconds
         }
 
 
-QOS_PROFILE = QoSProfile(
-    reliability=ReliabilityPolicy.BEST_EFFORT,
-    durability=DurabilityPolicy.VOLATILE,
-    depth = 1
-)
+class _PoseBuffer:
+    """
+    Fixed-capacity ring buffer specialized for `PoseDatum`.
+
+    Instead of a deque of NamedTuples, poses are stored structure-of-arrays
+    style in three preallocated numpy arrays (positions, quaternions,
+    timestamps). The 100+ Hz pose callback then only writes scalar slots
+    instead of allocating new Python objects per message, and `PoseDatum`s
+    are only reconstructed on the (much rarer) reads.
+
+    Single-producer invariant: `put` must only ever be called from one
+    thread (the rclpy subscription callback). Under that invariant the
+    buffer is lock-free: the writer bumps a sequence counter before and
+    after each write (odd = write in progress), and readers retry their
+    snapshot if the counter changed underneath them. CPython's GIL makes
+    the individual int/array-slot writes atomic, so no `threading.Lock`
+    is needed.
+
+    Exposes the same interface as `AsyncBuffer` for the subset used by
+    `PoseProvider`.
+    """
+    def __init__(self, capacity: int = 64):
+        if capacity < 1:
+            raise ValueError(f"Buffer capacity cannot be less than 1. Got {capacity}")
+        self._capacity = capacity
+        self._positions = np.empty((capacity, 3), dtype=np.float64)
+        self._quats = np.empty((capacity, 4), dtype=np.float64)
+        self._times = np.empty(capacity, dtype=np.float64)
+
+        # Index of the next slot to write. The freshest datum is at head - 1.
+        self._head = 0
+        self._count = 0
+
+        # Seqlock counter: odd while a write is in progress, even otherwise.
+        self._seq = 0
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def count(self):
+        return self._count
+
+    def __bool__(self):
+        return bool(self.count)
+
+    def put(self, datum: PoseDatum):
+        """
+        Writes a datum into the next slot. Producer side only: must not be
+        called concurrently with itself.
+        """
+        position = datum.position
+        quat = datum.quaternion
+        self._seq += 1
+        head = self._head
+        self._positions[head, 0] = position.x
+        self._positions[head, 1] = position.y
+        self._positions[head, 2] = position.z
+        self._quats[head] = quat
+        self._times[head] = datum.time_seconds
+        self._head = (head + 1) % self._capacity
+        self._count = min(self._count + 1, self._capacity)
+        self._seq += 1
+
+    def _read_consistent(self, read_fn: Callable[[], Any]) -> Any:
+        """
+        Runs `read_fn` against a consistent snapshot: if the writer's
+        sequence counter changed (or was mid-write) during the read, the
+        read is retried.
+        """
+        while True:
+            seq_before = self._seq
+            if seq_before & 1:
+                continue
+            result = read_fn()
+            if self._seq == seq_before:
+                return result
+
+    def _datum_at(self, index: int) -> PoseDatum:
+        """
+        Reconstructs the `PoseDatum` at the given physical slot index.
+        """
+        return PoseDatum(
+            position = Point(
+                x = self._positions[index, 0],
+                y = self._positions[index, 1],
+                z = self._positions[index, 2]
+            ),
+            quaternion = self._quats[index].copy(),
+            time_seconds = float(self._times[index])
+        )
+
+    def get_fresh(self, offset: int = 0) -> PoseDatum:
+        """
+        Gets the item at the freshness offset specified (if specified).
+        Otherwise, get the freshest datum
+        """
+        if offset < 0:
+            raise ValueError(f"Offset cannot be less than 0. Got {offset}")
+
+        def read():
+            if offset >= self._count:
+                raise IndexError(f"Offset {offset} out of range for buffer with {self._count} items")
+            return self._datum_at((self._head - 1 - offset) % self._capacity)
+
+        return self._read_consistent(read)
+
+    def get_all(self) -> list[PoseDatum]:
+        """
+        Returns all items in the buffer in the order of freshest first.
+        """
+        return self._read_consistent(lambda: [
+            self._datum_at((self._head - 1 - offset) % self._capacity)
+            for offset in range(self._count)
+        ])
+
+    def get_all_reversed(self) -> list[PoseDatum]:
+        """
+        Returns all items in the buffer in the order of oldest first.
+        """
+        return self._read_consistent(lambda: [
+            self._datum_at((self._head - self._count + i) % self._capacity)
+            for i in range(self._count)
+        ])
+
+    def get_interpolation_endpoints(self, time_seconds: float) -> tuple[PoseDatum | None, PoseDatum | None]:
+        """
+        Finds the buffered data points straddling `time_seconds`, searching
+        the raw timestamp array directly so no intermediate `PoseDatum`s
+        are built for the poses that don't matter.
+
+        Returns `(before, after)`, where `before` is None if the time
+        predates the whole buffer (with `after` set to the oldest datum)
+        and `after` is None if the time is newer than the whole buffer
+        (with `before` set to the newest datum).
+        """
+        def read():
+            count = self._count
+            start = (self._head - count) % self._capacity
+            physical = (start + np.arange(count)) % self._capacity
+            times = self._times[physical]
+            index = int(np.searchsorted(times, time_seconds))
+            if index == 0:
+                return (None, self._datum_at(int(physical[0])))
+            if index == count:
+                return (self._datum_at(int(physical[count - 1])), None)
+            return (
+                self._datum_at(int(physical[index - 1])),
+                self._datum_at(int(physical[index]))
+            )
+
+        return self._read_consistent(read)
+
+
+# Standard sensor-data profile (best effort, volatile, shallow history):
+# matches the RMW-level fast path for high-rate telemetry streams.
+QOS_PROFILE = qos_profile_sensor_data
 
 
 # TODO: Refactor to MAVSDK
-class PoseProvider(RosLoggingProvider[PoseStamped, PoseDatum]):        
+class PoseProvider(RosLoggingProvider[PoseStamped, PoseDatum]):
+    def _make_buffer(self, buffer_size: int) -> _PoseBuffer:
+        return _PoseBuffer(buffer_size)
+
     def _subscribe_to_topic(self, action: Callable[[PoseStamped], Any]) -> None:
+        # Dedicated callback group so the 100+ Hz pose stream isn't queued
+        # behind long-running callbacks (e.g. imaging services) when the
+        # node is spun with a multi-threaded executor.
+        self._callback_group = MutuallyExclusiveCallbackGroup()
         self.node.create_subscription(
             PoseStamped,
             '/mavros/local_position/pose',
             action,
-            QOS_PROFILE
+            QOS_PROFILE,
+            callback_group = self._callback_group
         )
         
     def log_to_file(self, item: PoseDatum):
@@ -57,7 +227,7 @@ class PoseProvider(RosLoggingProvider[PoseStamped, PoseDatum]):
         
         return PoseDatum(
             position = message.pose.position,
-            rotation = Rotation.from_quat(
+            quaternion = np.array(
                 [quaternion.x, quaternion.y, quaternion.z, quaternion.w]),
             time_seconds = message.header.stamp.sec + message.header.stamp.nanosec / 1e9
         )
@@ -75,32 +245,28 @@ class PoseProvider(RosLoggingProvider[PoseStamped, PoseDatum]):
         """
         if self._buffer.count == 0:
             return None
-        
-        data = self._buffer.get_all_reversed()
-        
-        closest_idx = bisect_left([d.time_seconds for d in data], time_seconds)
-        
-        if closest_idx == 0:
-            return data[0]
-        
+
+        pt_before, pt_after = self._buffer.get_interpolation_endpoints(time_seconds)
+
+        if pt_before is None:
+            return pt_after
+
         # Poll every 100ms, timeout after 1 sec (configurable)
         time_waited = 0
-        while closest_idx == len(data):
+        while pt_after is None:
             if timeout is None:
-                return data[closest_idx - 1]
+                return pt_before
 
-            poll_period = 0.1   
+            poll_period = 0.1
             time.sleep(poll_period)
             time_waited += poll_period
             self.log("Waiting for new pose datum")
             if time_waited > timeout:
                 self.log("Pose interpolation timed out. Returning latest.")
                 return None
-            data = self._buffer.get_all_reversed()
-            closest_idx = bisect_left([d.time_seconds for d in data], time_seconds)
-            
-        pt_before = data[closest_idx - 1]
-        pt_after = data[closest_idx]
+            pt_before, pt_after = self._buffer.get_interpolation_endpoints(time_seconds)
+            if pt_before is None:
+                return pt_after
 
         # Interpolate between the two points
         proportion = (time_seconds - pt_before.time_seconds) / (pt_after.time_seconds - pt_before.time_seconds)
@@ -110,15 +276,13 @@ class PoseProvider(RosLoggingProvider[PoseStamped, PoseDatum]):
             z = pt_before.position.z + proportion * (pt_after.position.z - pt_before.position.z)
         )
         key_times = [pt_before.time_seconds, pt_after.time_seconds]
-        rotations = Rotation.concatenate([pt_before.rotation, pt_after.rotation])
+        rotations = Rotation.from_quat([pt_before.quaternion, pt_after.quaternion])
         slerp = Slerp(key_times, rotations)
-        rotation = Rotation.from_quat(slerp([time_seconds]).as_quat()[0])
-        # go to and from quaternion to force returned
-        # object to be single rotation
+        quaternion = slerp([time_seconds]).as_quat()[0]
 
         return PoseDatum(
             position = position,
-            rotation = rotation,
+            quaternion = quaternion,
             time_seconds = time_seconds
         )
 
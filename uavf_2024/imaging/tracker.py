@@ -14,6 +14,13 @@ class Track:
     def __init__(self, measurements: list[Target3D]):
         assert len(measurements) > 0
         self._measurements = measurements
+        # Running sums so adding a measurement is O(1) instead of
+        # rebuilding temporary lists and re-averaging from scratch.
+        self._position_sum = np.array(measurements[0].position, dtype=np.float64)
+        self._descriptor_sum = measurements[0].descriptor
+        for measurement in measurements[1:]:
+            self._position_sum += measurement.position
+            self._descriptor_sum = self._descriptor_sum + measurement.descriptor
         self._recalculate_averages()
 
     @property
@@ -29,11 +36,13 @@ class Track:
         return self._descriptor
 
     def _recalculate_averages(self) -> None:
-        self._position = np.mean([measurement.position for measurement in self._measurements], axis=0)
-        self._descriptor = np.mean([measurement.descriptor for measurement in self._measurements], axis=0)
+        self._position = self._position_sum / len(self._measurements)
+        self._descriptor = self._descriptor_sum / len(self._measurements)
 
     def add_measurement(self, measurement: Target3D) -> None:
         self._measurements.append(measurement)
+        self._position_sum += measurement.position
+        self._descriptor_sum = self._descriptor_sum + measurement.descriptor
         self._recalculate_averages()
 
     def get_measurements(self) -> list[Target3D]:
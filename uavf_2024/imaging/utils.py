@@ -1,13 +1,41 @@
+import os
 from typing import Generator, List
 
 import numpy as np
 import torch
+from ultralytics import YOLO
 
 from .imaging_types import ProbabilisticTargetDescriptor, Tile
 from math import log
 
+from functools import lru_cache
 from itertools import islice
 
+
+def resolve_weights(weights_stem: str) -> str:
+    '''
+    Picks the fastest available export for a set of YOLO weights:
+    a TensorRT engine if one was built for this machine, else an ONNX
+    export (ultralytics runs it through onnxruntime), else the PyTorch
+    checkpoint. Exports are produced offline with
+    YOLO('<stem>.pt').export(format='engine'|'onnx', half=True).
+    '''
+    for ext in ('.engine', '.onnx'):
+        if os.path.exists(weights_stem + ext):
+            return weights_stem + ext
+    return weights_stem + '.pt'
+
+
+@lru_cache(maxsize=None)
+def load_yolo(weights_path: str) -> YOLO:
+    '''
+    Cached YOLO loader so repeated constructions of the same detector
+    (e.g. tests or benchmarks building several ImageProcessors) share one
+    model instance instead of re-reading the weights and reserving a
+    fresh set of CUDA workspaces each time.
+    '''
+    return YOLO(weights_path)
+
 def normalize_distribution( b: ProbabilisticTargetDescriptor, offset):
     shape_norm_prob = (b.shape_probs + offset)/sum(b.shape_probs + offset)
     letter_norm_prob = (b.letter_probs + offset)/sum(b.letter_probs + offset)